@@ -1,20 +1,42 @@
+import csv
+import datetime
 import io
 import json
 import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from urllib.parse import urlparse
 
+import numpy as np
 import pandas as pd
 import requests
 import streamlit as st
-from bs4 import BeautifulSoup
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from selectolax.lexbor import LexborHTMLParser
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 
 from io import BytesIO
 from PIL import Image
 import pytesseract
+import xlsxwriter
+
+# orjson parses JSON-LD blocks several times faster; fall back to stdlib json
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    HAS_ORJSON = True
+except Exception:
+    _json_loads = json.loads
+    HAS_ORJSON = False
 
 # Try to import Playwright, but don't die if it's not available
 try:
-    from playwright.sync_api import sync_playwright
+    import playwright.sync_api  # noqa: F401
     HAS_PLAYWRIGHT = True
 except Exception:
     HAS_PLAYWRIGHT = False
@@ -26,6 +48,7 @@ try:
         try_bypass_age_gate,
         auto_install_playwright_chromium,
         is_missing_browser_error,
+        run_with_browser,
     )
     from scraping.dutchie_parser import parse_dutchie_responses
     from scraping.dutchie_graphql import crawl_dutchie
@@ -71,16 +94,20 @@ The app will:
   purchasable variant (size / weight)
 - For other JS-heavy menus: capture live API/GraphQL responses via Playwright
 - Fall back to HTML / JSON-LD parsing, then OCR screenshot if needed
-- Let you scan **MED and REC menus separately** and export everything to **Excel**
+- Let you scan **MED and REC menus separately**, or a whole **batch** of menus
+  at once, and export everything to **Excel**
 
 > **Setup note:** Browser mode requires Playwright's Chromium binary.  
 > Run once: `playwright install chromium`
 """
 )
 
-# Initialise combined data storage
-if "all_competitors" not in st.session_state:
-    st.session_state["all_competitors"] = pd.DataFrame()
+# Initialise combined data storage: one frame per scan, concatenated only
+# when the combined table is rendered (avoids re-copying every prior scan)
+if "all_competitors_frames" not in st.session_state:
+    st.session_state["all_competitors_frames"] = []
+    # Bumped on every append/clear; keys the cached combined view below
+    st.session_state["all_competitors_version"] = 0
 
 # Get screenshot API key from secrets, if present
 SCREENSHOT_API_KEY = ""
@@ -94,27 +121,168 @@ except Exception:
 # HTTP / HTML helpers
 # -------------------------
 
-
-def fetch_html(url: str, timeout: int = 20) -> str | None:
-    """
-    Fetch raw HTML for a URL, with a desktop user agent.
-    """
-    headers = {
+# Shared session so repeated requests to the same host (MED + REC scans,
+# screenshot API calls) reuse pooled keep-alive connections.
+_SESSION = requests.Session()
+_SESSION.headers.update(
+    {
         "User-Agent": (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
             "AppleWebKit/537.36 (KHTML, like Gecko) "
             "Chrome/123.0 Safari/537.36"
-        )
+        ),
+        "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+        # Every compression urllib3 can decode here (adds br / zstd when the
+        # brotli / zstandard packages are installed)
+        "Accept-Encoding": ACCEPT_ENCODING,
     }
-    try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
+)
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+    ),
+)
+_SESSION.mount("http://", _HTTP_ADAPTER)
+_SESSION.mount("https://", _HTTP_ADAPTER)
+
+
+def _parse_html(html: str) -> LexborHTMLParser:
+    """
+    Build a read-only DOM with selectolax's Lexbor (C) backend.
+    Every parse site goes through here so the parser choice is one line.
+    """
+    return LexborHTMLParser(html)
+
+
+# Menu markup lives well inside this; the rest of outsized pages is
+# analytics/JS we never parse.
+MAX_HTML_BYTES = 3_000_000
+
+
+# Concurrent static fetches allowed per host, so batch scans of several
+# menus on one site don't trip its rate limiting
+_HOST_CONCURRENCY = 2
+_host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    """Return the per-host semaphore for *url* (use as a context manager)."""
+    host = urlparse(url).netloc.lower()
+    with _host_semaphores_lock:
+        sem = _host_semaphores.get(host)
+        if sem is None:
+            sem = _host_semaphores[host] = threading.BoundedSemaphore(
+                _HOST_CONCURRENCY
+            )
+    return sem
+
+
+@st.cache_data(ttl=600, max_entries=64, show_spinner=False)
+def _fetch_html_cached(url: str, timeout: int) -> str:
+    """
+    Cached network fetch behind fetch_html.  Raises on failure so errors
+    are never cached — only successful responses are memoized.
+
+    The body is streamed and capped at MAX_HTML_BYTES, then decoded once.
+    Status and Content-Type are checked before any of the body is read, so
+    error pages and non-HTML assets cost no download.
+    """
+    with _host_slot(url), _SESSION.get(url, timeout=timeout, stream=True) as resp:
         resp.raise_for_status()
-        return resp.text
+        ctype = resp.headers.get("Content-Type", "").lower()
+        if ctype and not any(t in ctype for t in ("html", "xml", "text/")):
+            raise ValueError(f"not an HTML page (Content-Type: {ctype})")
+        body = resp.raw.read(MAX_HTML_BYTES, decode_content=True)
+        # resp.apparent_encoding would read (and sniff) the whole body, so
+        # rely on the declared charset and default to UTF-8.  requests
+        # reports ISO-8859-1 for any text/* response without a charset,
+        # which would garble UTF-8 menus, so only trust an explicit one.
+        encoding = resp.encoding if "charset=" in ctype else None
+        return body.decode(encoding or "utf-8", errors="replace")
+
+
+def fetch_html(url: str, timeout: int = 20) -> str | None:
+    """
+    Fetch raw HTML for a URL, with a desktop user agent (set on _SESSION).
+    Results are cached per URL for 10 minutes.
+    """
+    try:
+        return _fetch_html_cached(url, timeout)
     except Exception as e:
         st.error(f"Error fetching {url}: {e}")
         return None
 
 
+def forget_cached_page(url: str, timeout: int = 20) -> None:
+    """Drop the cached static fetch of *url*, if any."""
+    _fetch_html_cached.clear(url, timeout)
+
+
+# HTML signals per engine, checked in priority order against the
+# lower-cased page.  Plain substring tests run at memchr/memcmp speed; an
+# IGNORECASE regex over a multi-MB page is an order of magnitude slower.
+_ENGINE_HTML_SIGNALS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    # Strong Dutchie signals: iframe/script src, dtche config, graphql endpoint
+    (
+        "dutchie",
+        (
+            "dutchie.com",
+            "dtche[",
+            "dtche%5b",
+            '"dtche"',
+            "window.dtche",
+            "dutchie-embed",
+            "dutchie_embed",
+            "plus.dutchie",
+            'src="https://dutchie',
+            "src='https://dutchie",
+            "dutchie/graphql",
+            "menu.dutchie",
+        ),
+    ),
+    ("jane", ("iheartjane.com", "jane-root", "data-jane-")),
+    ("weedmaps", ("weedmaps.com", "wm-menu")),
+    # Dispense — only reached if no Dutchie signals matched above.  These are
+    # HTML content pattern checks for engine detection, not security-sensitive
+    # URL validation; substring matching is intentional.
+    ("dispense", ("dispenseapp.com", "dispense.io", '"dispenseapp"')),
+    ("tymber", ("tymber",)),
+)
+
+
+@lru_cache(maxsize=128)
+def detect_engine_from_url(url: str) -> str | None:
+    """
+    Engine hint from the URL host alone (dutchie.com, iheartjane.com,
+    weedmaps.com).  Returns None when the host is not conclusive.
+    """
+    netloc = urlparse(url).netloc.lower()
+    if "dutchie" in netloc or "plus.dutchie" in netloc:
+        return "dutchie"
+    if "iheartjane" in netloc or "jane.menu" in netloc:
+        return "jane"
+    if "weedmaps" in netloc:
+        return "weedmaps"
+    return None
+
+
+def detect_engine_from_html(html: str) -> str:
+    """
+    Engine from page content, checking _ENGINE_HTML_SIGNALS in priority
+    order.  Returns 'generic' when nothing matches.
+    """
+    lower = html.lower()
+    for name, signals in _ENGINE_HTML_SIGNALS:
+        if any(sig in lower for sig in signals):
+            return name
+    return "generic"
+
+
 def detect_engine(url: str, html: str) -> str:
     """
     Auto-detect which ecommerce engine is backing this menu.
@@ -128,88 +296,116 @@ def detect_engine(url: str, html: str) -> str:
       5. Tymber signals
       6. Generic fallback
     """
-    netloc = urlparse(url).netloc.lower()
-    lower = html.lower()
+    return detect_engine_from_url(url) or detect_engine_from_html(html)
 
-    # 1) Direct host hints (strongest signal)
-    if "dutchie" in netloc or "plus.dutchie" in netloc:
-        return "dutchie"
-    if "iheartjane" in netloc or "jane.menu" in netloc:
-        return "jane"
-    if "weedmaps" in netloc:
-        return "weedmaps"
 
-    # 2) Strong Dutchie signals in HTML (iframe, script, config objects)
-    #    Check multiple patterns: dtche config, dutchie.com src, embedded iframe
-    dutchie_signals = [
-        "dutchie.com",
-        "dtche[",
-        "dtche%5b",
-        '"dtche"',
-        "window.dtche",
-        "dutchie-embed",
-        "dutchie_embed",
-        "plus.dutchie",
-        'src="https://dutchie',
-        "src='https://dutchie",
-        "dutchie/graphql",
-        "menu.dutchie",
-    ]
-    if any(sig in lower for sig in dutchie_signals):
-        return "dutchie"
+# -------------------------
+# Generic parsers (HTML / JSON-LD)
+# -------------------------
 
-    # 3) Jane / Weedmaps signals
-    if "iheartjane.com" in lower or "jane-root" in lower or "data-jane-" in lower:
-        return "jane"
+# Patterns shared by the JSON-LD, HTML card and OCR parsers
+_LETTER_RE = re.compile(r"[A-Za-z]")
+_NUM_RE = re.compile(r"(\d+(?:\.\d+)?)")
+_NAN = float("nan")
 
-    if "weedmaps.com" in lower or "wm-menu" in lower:
-        return "weedmaps"
+# Price and THC alternatives, so one sweep over a card text / OCR line finds
+# both; as alternatives, a price's digits can't also be read as THC ($35 THC)
+_PRICE_THC_RE = re.compile(
+    r"\$(?P<price>[\d.,]+)|(?P<thc>\d+(?:\.\d+)?)\s*%?\s*thc", re.IGNORECASE
+)
 
-    # 4) Dispense signals — only if no Dutchie signals detected above.
-    #    These are HTML content pattern checks for engine detection, not
-    #    security-sensitive URL validation; substring matching is intentional.
-    if "dispenseapp.com" in lower or "dispense.io" in lower or '"dispenseapp"' in lower:
-        return "dispense"
 
-    # 5) Tymber signals
-    if "tymber" in lower:
-        return "tymber"
+def _first_price_thc(text: str) -> tuple[re.Match | None, re.Match | None]:
+    """Return the first price match and first THC match in *text*."""
+    m_price = None
+    m_thc = None
+    for m in _PRICE_THC_RE.finditer(text):
+        if m.lastgroup == "price":
+            m_price = m_price or m
+        else:
+            m_thc = m_thc or m
+        if m_price and m_thc:
+            break
+    return m_price, m_thc
 
-    return "generic"
 
+def _match_price(m: re.Match | None) -> float:
+    """Price from a _PRICE_THC_RE match ("1,020.00" -> 1020.0); NaN if unusable."""
+    if m is None:
+        return _NAN
+    try:
+        return float(m.group("price").replace(",", ""))
+    except ValueError:
+        return _NAN
 
-# -------------------------
-# Generic parsers (HTML / JSON-LD)
-# -------------------------
+
+def _match_thc(m: re.Match | None) -> float:
+    """THC % from a _PRICE_THC_RE match (always a valid decimal); NaN if None."""
+    return float(m.group("thc")) if m else _NAN
+
+
+# JSON-LD blocks larger than this are malformed or catch-all blobs
+MAX_JSONLD_CHARS = 1_000_000
+# Keys whose values may hold further JSON-LD nodes (e.g. @graph, ItemList)
+_JSONLD_NESTED_KEYS = ("@graph", "itemListElement", "mainEntity", "item")
+
+_PRODUCT_COLUMNS = ["Product", "Category", "Price", "THC", "Source"]
+
+
+def _products_frame(rows: list[dict]) -> pd.DataFrame:
+    """
+    Build the standard parser DataFrame in one shot.  Parsers already store
+    Price/THC as float | None, so a float64 cast (None -> NaN) replaces a
+    per-column pd.to_numeric pass.
+    """
+    df = pd.DataFrame.from_records(rows, columns=_PRODUCT_COLUMNS)
+    return df.astype({"Price": "float64", "THC": "float64"})
 
 
-def parse_products_from_jsonld(html: str, category_hint: str | None = None) -> pd.DataFrame:
+def parse_products_from_jsonld(
+    tree: LexborHTMLParser, category_hint: str | None = None
+) -> pd.DataFrame:
     """
     Look for <script type="application/ld+json"> blocks and pull out
     basic Product / Offer info where available.
     Returns a DataFrame with columns: Product, Category, Price, THC, Source
     """
-    soup = BeautifulSoup(html, "html.parser")
-    scripts = soup.find_all("script", type="application/ld+json")
+    scripts = tree.css('script[type="application/ld+json"]')
+    if not scripts:
+        return _products_frame([])
 
-    rows: list[dict] = []
+    # Column buffers; Category/Source are constant and broadcast at the end
+    names: list[str] = []
+    prices: list[float] = []
+    thcs: list[float] = []
 
     for tag in scripts:
-        raw = tag.string
-        if not raw:
+        raw = tag.text()
+        if not raw or len(raw) > MAX_JSONLD_CHARS:
             continue
 
         try:
-            data = json.loads(raw)
+            # orjson accepts str directly (no .encode() copy needed)
+            data = _json_loads(raw)
         except Exception:
             continue
 
-        items = data if isinstance(data, list) else [data]
-
-        for item in items:
+        # Products are often nested under @graph / ItemList wrappers, so walk
+        # every container breadth-first (document order within each level)
+        pending = deque([data])
+        while pending:
+            item = pending.popleft()
+            if isinstance(item, list):
+                pending.extend(item)
+                continue
             if not isinstance(item, dict):
                 continue
 
+            for key in _JSONLD_NESTED_KEYS:
+                nested = item.get(key)
+                if isinstance(nested, (dict, list)):
+                    pending.append(nested)
+
             item_type = item.get("@type") or item.get("type")
 
             if isinstance(item_type, str) and "product" in item_type.lower():
@@ -218,15 +414,19 @@ def parse_products_from_jsonld(html: str, category_hint: str | None = None) -> p
                 offers = item.get("offers") or {}
                 if isinstance(offers, list):
                     offers = offers[0] if offers else {}
+                if not isinstance(offers, dict):
+                    offers = {}
                 price = offers.get("price")
                 if isinstance(price, str):
                     try:
                         price = float(price)
                     except ValueError:
-                        price = None
+                        price = _NAN
+                elif not isinstance(price, (int, float)):
+                    price = _NAN
 
                 # THC from additionalProperty
-                thc_val = None
+                thc_val = _NAN
                 add_props = item.get("additionalProperty") or item.get(
                     "additionalProperties"
                 )
@@ -234,100 +434,145 @@ def parse_products_from_jsonld(html: str, category_hint: str | None = None) -> p
                     for p in add_props:
                         if not isinstance(p, dict):
                             continue
-                        name_prop = (p.get("name") or "").lower()
-                        if "thc" in name_prop:
+                        name_prop = p.get("name")
+                        if isinstance(name_prop, str) and "thc" in name_prop.lower():
                             val = p.get("value") or p.get("valueReference")
                             if isinstance(val, (int, float)):
                                 thc_val = val
                                 break
                             if isinstance(val, str):
-                                m = re.search(r"(\d+(\.\d+)?)", val)
+                                m = _NUM_RE.search(val)
                                 if m:
                                     thc_val = float(m.group(1))
                                     break
 
                 if name:
-                    rows.append(
-                        {
-                            "Product": name,
-                            "Category": category_hint,
-                            "Price": price,
-                            "THC": thc_val,
-                            "Source": "JSON-LD",
-                        }
-                    )
+                    names.append(name)
+                    prices.append(price)
+                    thcs.append(thc_val)
+
+    if not names:
+        return _products_frame([])
+
+    return pd.DataFrame(
+        {
+            "Product": names,
+            "Category": category_hint,
+            "Price": np.asarray(prices, dtype="float64"),
+            "THC": np.asarray(thcs, dtype="float64"),
+            "Source": "JSON-LD",
+        },
+        columns=_PRODUCT_COLUMNS,
+    )
 
-    if not rows:
-        return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
 
-    df = pd.DataFrame(rows)
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    df["THC"] = pd.to_numeric(df["THC"], errors="coerce")
-    return df
+# Product card containers, as one CSS selector list
+_CARD_SELECTOR = ", ".join(
+    [
+        "[class*='product-card']",
+        "[class*='ProductCard']",
+        "[class*='menu-item']",
+        "[class*='MenuItem']",
+        "[data-product-name]",
+    ]
+)
 
 
-def extract_generic_cards(soup: BeautifulSoup, category_hint: str | None = None) -> pd.DataFrame:
+def extract_generic_cards(tree: LexborHTMLParser, category_hint: str | None = None) -> pd.DataFrame:
     """
     Super-generic fallback parser for HTML card grids.
     Tries to infer product name, price, and THC.
+
+    Price and THC come from one _PRICE_THC_RE sweep over each card's text.
     """
-    rows: list[dict] = []
+    names: list[str] = []
+    prices: list[float] = []
+    thcs: list[float] = []
+
+    # One selector-list query walks the DOM once (in document order); Lexbor
+    # repeats a node for every selector it matches, so dedupe by node id.
+    seen: set[int] = set()
+    for card in tree.css(_CARD_SELECTOR):
+        if card.mem_id in seen:
+            continue
+        seen.add(card.mem_id)
+
+        name = card.attributes.get("data-product-name")
+        if not name:
+            h = card.css_first("h1, h2, h3, h4")
+            if h:
+                name = h.text(strip=True)
+        if not name:
+            continue
 
-    selectors = [
-        "[class*='product-card']",
-        "[class*='ProductCard']",
-        "[class*='menu-item']",
-        "[class*='MenuItem']",
-        "[data-product-name]",
-    ]
+        m_price, m_thc = _first_price_thc(card.text(separator=" ", strip=True))
+        names.append(name)
+        prices.append(_match_price(m_price))
+        thcs.append(_match_thc(m_thc))
+
+    if not names:
+        return _products_frame([])
+
+    return pd.DataFrame(
+        {
+            "Product": names,
+            "Category": category_hint,
+            "Price": np.asarray(prices, dtype="float64"),
+            "THC": np.asarray(thcs, dtype="float64"),
+            "Source": "HTML card",
+        },
+        columns=_PRODUCT_COLUMNS,
+    )
 
-    for selector in selectors:
-        for card in soup.select(selector):
-            name = card.get("data-product-name")
-            if not name:
-                h = card.find(["h1", "h2", "h3", "h4"])
-                if h:
-                    name = h.get_text(strip=True)
-            if not name:
-                continue
 
-            text = card.get_text(" ", strip=True)
-
-            # Price
-            price = None
-            m_price = re.search(r"\$([\d.,]+)", text)
-            if m_price:
-                try:
-                    price = float(m_price.group(1).replace(",", ""))
-                except ValueError:
-                    price = None
-
-            # THC
-            thc = None
-            m_thc = re.search(r"(\d+(\.\d+)?)\s*%?\s*thc", text, re.I)
-            if m_thc:
-                try:
-                    thc = float(m_thc.group(1))
-                except ValueError:
-                    thc = None
-
-            rows.append(
-                {
-                    "Product": name,
-                    "Category": category_hint,
-                    "Price": price,
-                    "THC": thc,
-                    "Source": "HTML card",
-                }
-            )
+# Scripts that assign server-rendered app state to a global, e.g.
+# window.__APOLLO_STATE__ = {...};
+_APOLLO_STATE_RE = re.compile(r"__APOLLO_STATE__\s*=\s*")
+_JSON_DECODER = json.JSONDecoder()
+
+
+def parse_products_from_embedded_state(tree: LexborHTMLParser) -> pd.DataFrame:
+    """
+    Pull products out of JSON state that server-rendered menus embed in
+    the page: Next.js ``<script id="__NEXT_DATA__">`` and Apollo's
+    ``window.__APOLLO_STATE__``.
+
+    The blobs are searched with the same product walker used for captured
+    API responses.  They also describe stores, brands and categories, so
+    only priced nodes are kept.
+    """
+    if not HAS_BROWSER_HELPERS:
+        return _products_frame([])
+
+    payloads: list[dict] = []
+
+    next_data = tree.css_first("script#__NEXT_DATA__")
+    if next_data is not None:
+        raw = next_data.text()
+        if raw and len(raw) <= MAX_HTML_BYTES:
+            try:
+                payloads.append({"url": "__NEXT_DATA__", "json": _json_loads(raw)})
+            except Exception:
+                pass
+
+    for script in tree.css("script:not([src])"):
+        raw = script.text()
+        m = _APOLLO_STATE_RE.search(raw) if "__APOLLO_STATE__" in raw else None
+        if not m:
+            continue
+        try:
+            # raw_decode stops at the end of the object literal, so trailing
+            # JS (";", other assignments) does not need to be trimmed
+            data, _ = _JSON_DECODER.raw_decode(raw, m.end())
+        except ValueError:
+            continue
+        payloads.append({"url": "__APOLLO_STATE__", "json": data})
 
-    if not rows:
-        return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
+    if not payloads:
+        return _products_frame([])
 
-    df = pd.DataFrame(rows)
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    df["THC"] = pd.to_numeric(df["THC"], errors="coerce")
-    return df
+    df = parse_dutchie_responses(payloads)
+    return df[df["Price"].notna()].reset_index(drop=True)
 
 
 # -------------------------
@@ -335,33 +580,46 @@ def extract_generic_cards(soup: BeautifulSoup, category_hint: str | None = None)
 # -------------------------
 
 
+def _screenshot_with_browser(browser, url: str) -> bytes:
+    """Render *url* in a fresh context on a shared browser and screenshot it."""
+    context = browser.new_context(viewport={"width": 1400, "height": 900})
+    try:
+        page = context.new_page()
+        page.goto(url, wait_until="networkidle", timeout=30000)
+        # Basic scroll to trigger lazy loading
+        page.mouse.wheel(0, 5000)
+        page.wait_for_timeout(2000)
+        return page.screenshot(full_page=True)
+    finally:
+        context.close()
+
+
 def screenshot_page_playwright(url: str) -> bytes | None:
     """
     Use a headless browser (Playwright) to render the page and take
     a full-page PNG screenshot. Returns raw bytes or None on failure.
+
+    Runs on the shared Chromium from scraping.playwright_helpers, so only
+    a new context is created per screenshot.
     """
-    if not HAS_PLAYWRIGHT:
+    if not HAS_PLAYWRIGHT or not HAS_BROWSER_HELPERS:
         return None
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(viewport={"width": 1400, "height": 900})
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            # Basic scroll to trigger lazy loading
-            page.mouse.wheel(0, 5000)
-            page.wait_for_timeout(2000)
-            screenshot_bytes = page.screenshot(full_page=True)
-            browser.close()
-        return screenshot_bytes
+        return run_with_browser(_screenshot_with_browser, url)
     except Exception as e:
-        if HAS_BROWSER_HELPERS and is_missing_browser_error(e):
+        if is_missing_browser_error(e):
             st.warning(_PLAYWRIGHT_MISSING_BINARY_WARNING)
         else:
             st.info(f"Playwright screenshot failed: {e}")
         return None
 
 
+# Example provider: ScreenshotMachine. Adjust to your provider as needed.
+_SCREENSHOT_API_URL = "https://api.screenshotmachine.com/"
+_SCREENSHOT_API_PARAMS = {"dimension": "1280x720", "format": "png", "cacheLimit": "0"}
+
+
 def screenshot_page_api(url: str) -> bytes | None:
     """
     Use an external screenshot API as a fallback.
@@ -370,15 +628,10 @@ def screenshot_page_api(url: str) -> bytes | None:
     if not SCREENSHOT_API_KEY:
         return None
 
-    # Example: ScreenshotMachine-like URL. Adjust to your provider as needed.
-    api_url = (
-        "https://api.screenshotmachine.com/"
-        f"?key={SCREENSHOT_API_KEY}"
-        f"&url={requests.utils.quote(url, safe='')}"
-        "&dimension=1280x720&format=png&cacheLimit=0"
-    )
+    # ScreenshotMachine-like endpoint; requests encodes the query string
+    params = {"key": SCREENSHOT_API_KEY, "url": url, **_SCREENSHOT_API_PARAMS}
     try:
-        resp = requests.get(api_url, timeout=30)
+        resp = _SESSION.get(_SCREENSHOT_API_URL, params=params, timeout=30)
         resp.raise_for_status()
         if resp.headers.get("Content-Type", "").startswith("image"):
             return resp.content
@@ -405,17 +658,50 @@ def screenshot_page(url: str) -> bytes | None:
     return None
 
 
+# LSTM engine + single uniform text block: faster than auto-segmentation
+# on menu grids.
+_OCR_CONFIG = "--oem 1 --psm 6"
+# Full-page screenshots taller than this are OCR'd as horizontal strips in
+# parallel (each tesseract call is a subprocess, so threads overlap fully).
+_OCR_STRIP_HEIGHT = 3000
+# Wider images are downscaled first; menu text stays legible at this width
+_OCR_MAX_WIDTH = 1600
+
+
+def _ocr_image(img: Image.Image) -> str:
+    return pytesseract.image_to_string(img, config=_OCR_CONFIG)
+
+
 def ocr_text_from_image_bytes(img_bytes: bytes) -> str:
     """
     Run OCR on a PNG screenshot and return raw text.
+
+    The image is converted to grayscale before OCR (and decoded at reduced
+    scale when the source is a JPEG), narrowed to _OCR_MAX_WIDTH if wider,
+    then split into strips if it is very tall.
     """
     img = Image.open(BytesIO(img_bytes))
+    # Lets libjpeg's IDCT scaler decode at half size; a no-op for PNG
+    img.draft("L", (img.size[0] // 2, img.size[1] // 2))
+    img = img.convert("L")
+    if img.width > _OCR_MAX_WIDTH:
+        img = img.resize(
+            (_OCR_MAX_WIDTH, round(img.height * _OCR_MAX_WIDTH / img.width)),
+            Image.LANCZOS,
+        )
     try:
-        text = pytesseract.image_to_string(img)
+        width, height = img.size
+        if height <= _OCR_STRIP_HEIGHT:
+            return _ocr_image(img)
+        strips = [
+            img.crop((0, top, width, min(top + _OCR_STRIP_HEIGHT, height)))
+            for top in range(0, height, _OCR_STRIP_HEIGHT)
+        ]
+        with ThreadPoolExecutor(max_workers=min(4, len(strips))) as ex:
+            return "\n".join(ex.map(_ocr_image, strips))
     except Exception as e:
         st.info(f"OCR failed: {e}")
         return ""
-    return text
 
 
 def parse_products_from_ocr_text(text: str) -> pd.DataFrame:
@@ -426,58 +712,54 @@ def parse_products_from_ocr_text(text: str) -> pd.DataFrame:
 
     This will NOT be perfect, but it gives you something to work with.
     """
-    rows: list[dict] = []
+    names: list[str] = []
+    prices: list[float] = []
+    thcs: list[float] = []
 
     for raw_line in text.splitlines():
         line = raw_line.strip()
-        if not line:
+        # product lines need a price; a substring test is far cheaper than
+        # running the regex over every line of UI noise
+        if not line or "$" not in line:
             continue
 
+        # One sweep picks up the first price and the first THC value
+        m_price, m_thc = _first_price_thc(line)
+
         # require a price to treat as a product line
-        m_price = re.search(r"\$([\d.,]+)", line)
         if not m_price:
             continue
 
         # need at least one letter
-        if not re.search(r"[A-Za-z]", line):
+        if not _LETTER_RE.search(line):
             continue
 
-        try:
-            price = float(m_price.group(1).replace(",", ""))
-        except ValueError:
-            price = None
-
+        price = _match_price(m_price)
         # THC if present
-        thc = None
-        m_thc = re.search(r"(\d+(\.\d+)?)\s*%?\s*THC", line, re.I)
-        if m_thc:
-            try:
-                thc = float(m_thc.group(1))
-            except ValueError:
-                thc = None
+        thc = _match_thc(m_thc)
 
         # product name: line with the price stripped out
         name_part = line.replace(m_price.group(0), "").strip(" -•|")
         if not name_part:
             name_part = line
 
-        rows.append(
-            {
-                "Product": name_part,
-                "Category": None,
-                "Price": price,
-                "THC": thc,
-                "Source": "OCR screenshot",
-            }
-        )
-
-    if not rows:
-        return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
-
-    df = pd.DataFrame(rows)
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    df["THC"] = pd.to_numeric(df["THC"], errors="coerce")
-    return df
+        names.append(name_part)
+        prices.append(price)
+        thcs.append(thc)
+
+    if not names:
+        return _products_frame([])
+
+    return pd.DataFrame(
+        {
+            "Product": names,
+            "Category": None,
+            "Price": np.asarray(prices, dtype="float64"),
+            "THC": np.asarray(thcs, dtype="float64"),
+            "Source": "OCR screenshot",
+        },
+        columns=_PRODUCT_COLUMNS,
+    )
 
 
 def ocr_menu_from_url(url: str) -> pd.DataFrame:
@@ -489,11 +771,11 @@ def ocr_menu_from_url(url: str) -> pd.DataFrame:
     """
     screenshot_bytes = screenshot_page(url)
     if not screenshot_bytes:
-        return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
+        return pd.DataFrame(columns=_PRODUCT_COLUMNS)
 
     text = ocr_text_from_image_bytes(screenshot_bytes)
     if not text.strip():
-        return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
+        return pd.DataFrame(columns=_PRODUCT_COLUMNS)
 
     df_ocr = parse_products_from_ocr_text(text)
     return df_ocr
@@ -504,91 +786,72 @@ def ocr_menu_from_url(url: str) -> pd.DataFrame:
 # -------------------------
 
 
-def fetch_menu_dutchie(url: str, html: str) -> pd.DataFrame:
+def _parse_fallback(tree: LexborHTMLParser) -> pd.DataFrame:
+    """
+    Shared HTML fallback for the engine stubs, run against the one parsed
+    tree: JSON-LD first, then generic HTML cards.
+    """
+    df_ld = parse_products_from_jsonld(tree)
+    if not df_ld.empty:
+        return df_ld
+    return extract_generic_cards(tree)
+
+
+def fetch_menu_dutchie(url: str, tree: LexborHTMLParser) -> pd.DataFrame:
     """
     Dutchie menus: either a direct dutchie.com link, or a marketing site
     that embeds Dutchie via dtche[...] / iframe.
 
     API/GraphQL payloads are extracted upstream in fetch_competitor_menu before
     this function is called. This function handles HTML-based fallbacks only.
-
-    Extraction priority:
-      1) JSON-LD embedded in the HTML
-      2) Generic HTML card parsing
     """
-    # 1) JSON-LD
-    df_ld = parse_products_from_jsonld(html)
-    if not df_ld.empty:
-        return df_ld
-
-    # 2) Generic HTML cards
-    soup = BeautifulSoup(html, "html.parser")
-    df_cards = extract_generic_cards(soup)
-    if not df_cards.empty:
-        return df_cards
-
-    return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
+    return _parse_fallback(tree)
 
 
-def fetch_menu_jane(url: str, html: str) -> pd.DataFrame:
+def fetch_menu_jane(url: str, tree: LexborHTMLParser) -> pd.DataFrame:
     """
     Jane / iHeartJane stub.
     For now we lean on JSON-LD and generic cards.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    df_ld = parse_products_from_jsonld(html)
-    if not df_ld.empty:
-        return df_ld
-    df_cards = extract_generic_cards(soup)
-    return df_cards
+    return _parse_fallback(tree)
 
 
-def fetch_menu_weedmaps(url: str, html: str) -> pd.DataFrame:
+def fetch_menu_weedmaps(url: str, tree: LexborHTMLParser) -> pd.DataFrame:
     """
     Weedmaps stub.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    df_ld = parse_products_from_jsonld(html)
-    if not df_ld.empty:
-        return df_ld
-    df_cards = extract_generic_cards(soup)
-    return df_cards
+    return _parse_fallback(tree)
 
 
-def fetch_menu_dispense(url: str, html: str) -> pd.DataFrame:
+def fetch_menu_dispense(url: str, tree: LexborHTMLParser) -> pd.DataFrame:
     """
     Dispense / similar engines stub.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    df_ld = parse_products_from_jsonld(html)
-    if not df_ld.empty:
-        return df_ld
-    df_cards = extract_generic_cards(soup)
-    return df_cards
+    return _parse_fallback(tree)
 
 
-def fetch_menu_tymber(url: str, html: str) -> pd.DataFrame:
+def fetch_menu_tymber(url: str, tree: LexborHTMLParser) -> pd.DataFrame:
     """
     Tymber stub.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    df_ld = parse_products_from_jsonld(html)
-    if not df_ld.empty:
-        return df_ld
-    df_cards = extract_generic_cards(soup)
-    return df_cards
+    return _parse_fallback(tree)
 
 
-def fetch_menu_generic(url: str, html: str) -> pd.DataFrame:
+def fetch_menu_generic(url: str, tree: LexborHTMLParser) -> pd.DataFrame:
     """
     Generic fallback: JSON-LD first, then HTML cards on the exact URL.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    df_ld = parse_products_from_jsonld(html)
-    if not df_ld.empty:
-        return df_ld
-    df_cards = extract_generic_cards(soup)
-    return df_cards
+    return _parse_fallback(tree)
+
+
+# Engine name -> HTML stub; anything unlisted goes to fetch_menu_generic
+_ENGINE_FETCHERS = {
+    "dutchie": fetch_menu_dutchie,
+    "jane": fetch_menu_jane,
+    "weedmaps": fetch_menu_weedmaps,
+    "dispense": fetch_menu_dispense,
+    "tymber": fetch_menu_tymber,
+}
 
 
 # -------------------------
@@ -596,7 +859,37 @@ def fetch_menu_generic(url: str, html: str) -> pd.DataFrame:
 # -------------------------
 
 
+class _MenuFetchError(Exception):
+    """Raised inside the cached router so failed fetches are not memoized."""
+
+    def __init__(self, debug_info: dict):
+        super().__init__(debug_info.get("final_url"))
+        self.debug_info = debug_info
+
+
 def fetch_competitor_menu(
+    url: str,
+    use_browser: bool = False,
+    menu_type: str | None = None,
+    refresh: bool = False,
+) -> tuple[pd.DataFrame, str | None, dict]:
+    """
+    Cached entry point for _fetch_competitor_menu (see there for the flow).
+    Results are cached per (url, use_browser, menu_type) for 10 minutes;
+    a failed page fetch is returned uncached so the next scan retries.
+    With refresh=True the cached scan and page for *url* are dropped first.
+    """
+    if refresh:
+        forget_cached_page(url)
+        _fetch_competitor_menu.clear(url, use_browser=use_browser, menu_type=menu_type)
+    try:
+        return _fetch_competitor_menu(url, use_browser=use_browser, menu_type=menu_type)
+    except _MenuFetchError as exc:
+        return pd.DataFrame(), None, exc.debug_info
+
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def _fetch_competitor_menu(
     url: str, use_browser: bool = False, menu_type: str | None = None
 ) -> tuple[pd.DataFrame, str | None, dict]:
     """
@@ -608,7 +901,8 @@ def fetch_competitor_menu(
       4) Otherwise, if browser mode requested or engine is JS-heavy,
          use Playwright to render page and capture API/GraphQL payloads.
       5) Prefer JSON/API payload extraction over HTML parsing.
-      6) If still empty, try OCR fallback.
+      6) If still empty, look for embedded page state (__NEXT_DATA__ etc.).
+      7) If still empty, try OCR fallback.
     Returns (df, engine, debug_info)
     """
     debug_info: dict = {
@@ -624,11 +918,15 @@ def fetch_competitor_menu(
         "graphql_details": [],
     }
 
-    html = fetch_html(url)
-    if not html:
-        return pd.DataFrame(), None, debug_info
-
-    engine = detect_engine(url, html)
+    # The URL host alone is enough to route dutchie.com links to the crawler,
+    # so the static HTML is only fetched when it is actually needed.
+    engine = detect_engine_from_url(url)
+    html: str | None = None
+    if engine != "dutchie" or not HAS_BROWSER_HELPERS:
+        html = fetch_html(url)
+        if not html:
+            raise _MenuFetchError(debug_info)
+        engine = engine or detect_engine_from_html(html)
     debug_info["engine_initial"] = engine
 
     browser_payloads: list | None = None
@@ -661,6 +959,10 @@ def fetch_competitor_menu(
         debug_info["parse_notes"].append(
             "Dutchie GraphQL crawler found 0 rows – falling back to HTML parsing"
         )
+        if html is None:
+            html = fetch_html(url)
+            if not html:
+                raise _MenuFetchError(debug_info)
 
     # -----------------------------------------------------------------------
     # Generic browser mode (non-Dutchie JS-heavy engines)
@@ -706,19 +1008,9 @@ def fetch_competitor_menu(
             f"API extraction found 0 products from {len(browser_payloads)} responses"
         )
 
-    # 2) Engine-specific / generic HTML parsing
-    if engine == "dutchie":
-        df = fetch_menu_dutchie(url, html)
-    elif engine == "jane":
-        df = fetch_menu_jane(url, html)
-    elif engine == "weedmaps":
-        df = fetch_menu_weedmaps(url, html)
-    elif engine == "dispense":
-        df = fetch_menu_dispense(url, html)
-    elif engine == "tymber":
-        df = fetch_menu_tymber(url, html)
-    else:
-        df = fetch_menu_generic(url, html)
+    # 2) Engine-specific / generic HTML parsing (parse the DOM once, share it)
+    tree = _parse_html(html)
+    df = _ENGINE_FETCHERS.get(engine, fetch_menu_generic)(url, tree)
 
     if not df.empty:
         debug_info["parse_notes"].append(
@@ -728,7 +1020,16 @@ def fetch_competitor_menu(
 
     debug_info["parse_notes"].append("HTML/JSON-LD extraction found 0 products")
 
-    # 3) OCR fallback if HTML/API parsing found nothing and engine is JS-heavy
+    # 3) Server-rendered app state embedded in the page (__NEXT_DATA__,
+    #    Apollo) — a JSON parse instead of a screenshot + OCR round trip
+    df_state = parse_products_from_embedded_state(tree)
+    if not df_state.empty:
+        debug_info["parse_notes"].append(
+            f"Embedded page state extraction found {len(df_state)} products"
+        )
+        return df_state, engine, debug_info
+
+    # 4) OCR fallback if HTML/API parsing found nothing and engine is JS-heavy
     if js_heavy:
         st.info(
             "No products found in static HTML or API responses for this menu. "
@@ -751,14 +1052,138 @@ def fetch_competitor_menu(
 # -------------------------
 
 
-def make_excel_bytes(df: pd.DataFrame) -> bytes:
+# Cell types xlsxwriter writes natively; anything else is written as str()
+_EXCEL_NATIVE_TYPES = (
+    str,
+    int,
+    float,
+    np.integer,
+    np.floating,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+)
+
+
+def _excel_value(v):
     """
-    Convert a DataFrame to an in-memory Excel file.
+    Cell value for xlsxwriter: blank for NaN/None, native values as-is, and
+    str() for everything else (lists or dicts that reached a text column
+    from odd JSON), as pandas' to_excel writes them.
+    """
+    if pd.api.types.is_scalar(v):
+        if pd.isna(v):
+            return None
+        if isinstance(v, _EXCEL_NATIVE_TYPES):
+            return v
+    return str(v)
+
+
+def make_excel_bytes(df: pd.DataFrame) -> io.BytesIO:
+    """
+    Convert a DataFrame to an in-memory Excel file and return the buffer
+    (st.download_button accepts file-like data, so no bytes copy is made).
+
+    Rows are written in order with xlsxwriter's constant_memory mode, which
+    flushes each row instead of holding the whole sheet.  pandas' to_excel
+    can't be used with that mode: it emits cells column by column, and
+    constant_memory silently drops cells written to earlier rows.
     """
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Competitor Menus")
-    return output.getvalue()
+    workbook = xlsxwriter.Workbook(
+        output,
+        {
+            "constant_memory": True,
+            # Scraped text is data: no hyperlink objects per Source_URL and
+            # no formulas from names that happen to start with "="
+            "strings_to_urls": False,
+            "strings_to_formulas": False,
+        },
+    )
+    worksheet = workbook.add_worksheet("Competitor Menus")
+    header_fmt = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+    worksheet.write_row(0, 0, [str(c) for c in df.columns], header_fmt)
+    for r, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(r, 0, [_excel_value(v) for v in row])
+    workbook.close()
+    output.seek(0)
+    return output
+
+
+# -------------------------
+# Combined table
+# -------------------------
+
+
+# Low-cardinality label columns, stored as categoricals in the combined table
+_CATEGORICAL_COLUMNS = frozenset(
+    {"Dispensary", "Menu_Type", "Category", "Brand", "Engine", "Source", "Source_URL"}
+)
+
+
+def _combined_view() -> tuple[pd.DataFrame, float | None, int]:
+    """
+    Return (combined, avg_price, n_dispensaries) for this session's scans.
+
+    The result is memoized in session state against
+    all_competitors_version, so reruns from unrelated widgets reuse it
+    instead of re-concatenating every frame.
+    """
+    version = st.session_state["all_competitors_version"]
+    cached = st.session_state.get("_combined_view")
+    if cached and cached[0] == version:
+        return cached[1]
+
+    frames = st.session_state["all_competitors_frames"]
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    # Cast after the concat: concatenating categoricals whose categories
+    # differ falls back to object, so per-scan casts would be lost
+    for col in _CATEGORICAL_COLUMNS.intersection(combined.columns):
+        combined[col] = combined[col].astype("category")
+    avg_price = combined["Price"].mean() if "Price" in combined.columns else None
+    n_dispensaries = (
+        combined["Dispensary"].nunique() if "Dispensary" in combined.columns else 0
+    )
+    view = (combined, avg_price, n_dispensaries)
+    st.session_state["_combined_view"] = (version, view)
+    return view
+
+
+# -------------------------
+# Batch input
+# -------------------------
+
+# Upper bound on concurrent scans.  Their browser work (renders, screenshots,
+# Dutchie crawls) queues on the shared run_with_browser workers, so Chromium
+# processes stay capped at PLAYWRIGHT_WORKERS however many scans run.
+MAX_SCAN_WORKERS = 8
+
+
+def _parse_batch_entries(text: str) -> list[tuple[str, str]]:
+    """
+    Parse batch input into (url, label) pairs.
+
+    Accepts one ``URL`` or ``Label, URL`` per line, which also covers CSV
+    uploads (cells in any order).  Rows without an http(s) URL, such as
+    a CSV header, are skipped; the label defaults to the URL.  Each line is
+    read on its own, so a stray quote cannot swallow the lines after it,
+    and a repeated URL keeps its first label.
+    """
+    entries: list[tuple[str, str]] = []
+    seen: set[str] = set()
+    for line in (text or "").splitlines():
+        row = next(csv.reader([line]), [])
+        cells = [c.strip() for c in row if c.strip()]
+        scan_url = next(
+            (c for c in cells if c.lower().startswith(("http://", "https://"))),
+            None,
+        )
+        if scan_url is None or scan_url in seen:
+            continue
+        seen.add(scan_url)
+        label = next((c for c in cells if c != scan_url), scan_url)
+        entries.append((scan_url, label))
+    return entries
 
 
 # -------------------------
@@ -796,6 +1221,10 @@ with st.form("scan_form"):
                 "per-page counts, and parsing notes."
             ),
         )
+        force_refresh = st.checkbox(
+            "Force refresh – rescan even if this menu was scanned in the last 10 minutes",
+            value=False,
+        )
 
     st.markdown("**MED / REC options** (Dutchie menus)")
     col_med, col_rec = st.columns(2)
@@ -812,37 +1241,85 @@ with st.form("scan_form"):
             help="Leave blank to skip. If provided, scanned separately with Menu_Type=rec.",
         )
 
+    st.markdown("**Batch scan** (optional, several dispensaries at once)")
+    batch_text = st.text_area(
+        "Menu URLs, one per line (optionally `Label, URL`)",
+        placeholder="Solar Somerset, https://dutchie.com/dispensary/solar-somerset\nhttps://exampledispensary.com/menu",
+    )
+    batch_file = st.file_uploader(
+        "…or upload a CSV with a URL column (and optional label column)",
+        type=["csv", "txt"],
+    )
+
     submitted = st.form_submit_button("Scan & Add to Table")
 
-if submitted and (url.strip() or med_url.strip() or rec_url.strip()):
+batch_entries = _parse_batch_entries(batch_text)
+if batch_file is not None:
+    batch_entries += _parse_batch_entries(
+        batch_file.getvalue().decode("utf-8", errors="replace")
+    )
+
+if submitted and (
+    url.strip() or med_url.strip() or rec_url.strip() or batch_entries
+):
     label = dispo_name.strip() or url.strip() or med_url.strip() or rec_url.strip()
 
-    # Build list of (scan_url, menu_type_override) tuples
-    scan_jobs: list[tuple[str, str | None]] = []
+    # Build list of (scan_url, menu_type_override, label) tuples
+    scan_jobs: list[tuple[str, str | None, str]] = []
 
     # MED / REC specific URLs take priority
     if med_url.strip():
-        scan_jobs.append((med_url.strip(), "med"))
+        scan_jobs.append((med_url.strip(), "med", label))
     if rec_url.strip():
-        scan_jobs.append((rec_url.strip(), "rec"))
+        scan_jobs.append((rec_url.strip(), "rec", label))
     # Fall back to generic URL field
     if url.strip() and not scan_jobs:
-        scan_jobs.append((url.strip(), None))
+        scan_jobs.append((url.strip(), None, label))
+    # Batch entries, skipping URLs already queued above
+    queued = {(u, m) for u, m, _ in scan_jobs}
+    for batch_url, batch_label in batch_entries:
+        if (batch_url, None) not in queued:
+            queued.add((batch_url, None))
+            scan_jobs.append((batch_url, None, batch_label))
+
+    # Scan jobs are independent and network-bound, so run them concurrently.
+    # Workers get this run's ScriptRunContext so the st.info/st.warning calls
+    # inside fetch_competitor_menu still reach the page; everything else is
+    # rendered below on the main thread once all futures have resolved.
+    scan_results: dict[tuple[str, str | None], tuple] = {}
+    progress = st.progress(0.0, text=f"Scanning {len(scan_jobs)} menu(s)…")
+    with ThreadPoolExecutor(
+        max_workers=min(len(scan_jobs), MAX_SCAN_WORKERS),
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    ) as ex:
+        futures = {
+            ex.submit(
+                fetch_competitor_menu,
+                u,
+                use_browser=use_browser,
+                menu_type=m,
+                refresh=force_refresh,
+            ): (u, m)
+            for u, m, _ in scan_jobs
+        }
+        for done, fut in enumerate(as_completed(futures), start=1):
+            scan_results[futures[fut]] = fut.result()
+            progress.progress(
+                done / len(futures),
+                text=f"Scanned {done}/{len(futures)}: {futures[fut][0]}",
+            )
+    progress.empty()
 
-    for scan_url, menu_type_override in scan_jobs:
+    for scan_url, menu_type_override, label in scan_jobs:
         type_label = (
             f" [{menu_type_override.upper()}]" if menu_type_override else ""
         )
-        with st.spinner(f"Scanning{type_label}: {scan_url}…"):
-            df, engine, debug_info = fetch_competitor_menu(
-                scan_url,
-                use_browser=use_browser,
-                menu_type=menu_type_override,
-            )
+        df, engine, debug_info = scan_results[(scan_url, menu_type_override)]
 
         # Always show debug panel when debug mode is on
         if debug_mode:
-            with st.expander(f"🔍 Debug Info{type_label}", expanded=True):
+            with st.expander(f"🔍 Debug Info – {label}{type_label}", expanded=True):
                 st.markdown(f"**Initial engine detected:** `{debug_info.get('engine_initial')}`")
                 st.markdown(f"**Final engine after browser re-detect:** `{debug_info.get('engine_final')}`")
                 st.markdown(f"**Browser (Playwright) used:** `{debug_info.get('browser_used')}`")
@@ -895,40 +1372,38 @@ if submitted and (url.strip() or med_url.strip() or rec_url.strip()):
                         "need a CSV/Excel export from the platform or admin side."
                     )
         else:
-            # Normalize basic columns
-            if "Price" in df.columns:
-                df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-            if "THC" in df.columns:
-                df["THC"] = pd.to_numeric(df["THC"], errors="coerce")
-
-            df.insert(0, "Dispensary", label)
+            # Normalize basic columns and add the scan metadata in one assign
+            # (one new frame instead of an insert plus a copy per column)
+            updates: dict = {}
+            for col in ("Price", "THC"):
+                if col in df.columns:
+                    updates[col] = pd.to_numeric(df[col], errors="coerce")
             # Add Menu_Type column if not already present (e.g. from GraphQL crawler)
             if "Menu_Type" not in df.columns:
-                df["Menu_Type"] = menu_type_override
-            df["Engine"] = engine or "unknown"
+                updates["Menu_Type"] = menu_type_override
+            updates["Engine"] = engine or "unknown"
             if "Source_URL" not in df.columns:
-                df["Source_URL"] = scan_url
+                updates["Source_URL"] = scan_url
+            updates["Dispensary"] = label
+            df = df.assign(**updates)
+            df = df[["Dispensary", *(c for c in df.columns if c != "Dispensary")]]
 
             # Append to session_state master table
-            if st.session_state["all_competitors"].empty:
-                st.session_state["all_competitors"] = df
-            else:
-                st.session_state["all_competitors"] = pd.concat(
-                    [st.session_state["all_competitors"], df], ignore_index=True
-                )
+            st.session_state["all_competitors_frames"].append(df)
+            st.session_state["all_competitors_version"] += 1
 
             st.success(
                 f"Added **{len(df)}** products from **{label}**{type_label} "
                 f"(engine: **{engine or 'unknown'}**)."
             )
 
-            with st.expander(f"Preview rows{type_label}"):
+            with st.expander(f"Preview rows – {label}{type_label}"):
                 st.dataframe(df.head(50), use_container_width=True)
 
 st.markdown("---")
 st.subheader("Combined Competitor Table (all scans this session)")
 
-combined = st.session_state["all_competitors"]
+combined, avg_price, n_dispensaries = _combined_view()
 
 if combined.empty:
     st.info("No scans yet. Paste a menu URL above and hit *Scan & Add to Table*.")
@@ -937,26 +1412,18 @@ else:
     st.dataframe(combined, use_container_width=True, height=420)
 
     # Simple summary metrics
-    if "Price" in combined.columns:
-        avg_price = combined["Price"].mean()
-    else:
-        avg_price = None
-
     col1, col2, col3 = st.columns(3)
     col1.metric("Total Products", len(combined))
-    col2.metric(
-        "Unique Dispensaries",
-        combined["Dispensary"].nunique() if "Dispensary" in combined.columns else 0,
-    )
+    col2.metric("Unique Dispensaries", n_dispensaries)
     col3.metric(
         "Average Price (All)",
         f"${avg_price:,.2f}" if avg_price is not None and not pd.isna(avg_price) else "N/A",
     )
 
-    excel_bytes = make_excel_bytes(combined)
+    # Deferred: the workbook is only built when the button is clicked
     st.download_button(
         label="⬇️ Download Excel (All Dispos)",
-        data=excel_bytes,
+        data=lambda: make_excel_bytes(combined),
         file_name="comp_intel_all_dispensaries.xlsx",
         mime=(
             "application/vnd.openxmlformats-officedocument."
@@ -965,5 +1432,6 @@ else:
     )
 
     if st.button("Clear all data (this session)"):
-        st.session_state["all_competitors"] = pd.DataFrame()
+        st.session_state["all_competitors_frames"] = []
+        st.session_state["all_competitors_version"] += 1
         st.rerun()
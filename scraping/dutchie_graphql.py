@@ -4,24 +4,42 @@ Dutchie GraphQL-based menu crawler.
 Uses Playwright to capture Dutchie GraphQL API responses across all categories
 and paginated pages.  Handles MED and REC menus, in-stock filtering, and
 multi-variant products (one row per purchasable size/weight option).
+After the first product query is captured, further category pages are
+fetched by replaying that GraphQL request directly, falling back to
+browser navigation when a replay fails.
 
 Provides:
 - crawl_dutchie(url, menu_type=None, timeout=45000, max_pages=20)
   -> (DataFrame, debug_info)
 """
 
+import hashlib
 import json
 import re
-from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
 
 import pandas as pd
+import requests
+
+from scraping.dutchie_parser import lower_key
+from scraping.playwright_helpers import (
+    HAS_PLAYWRIGHT,
+    _DEFAULT_ACTION_TIMEOUT_MS,
+    _age_gate_cookies,
+    _block_heavy_resources,
+    run_with_browser,
+    try_bypass_age_gate,
+)
 
+# orjson decodes the multi-MB GraphQL bodies several times faster and takes
+# the raw bytes directly; fall back to stdlib json (which also accepts bytes)
 try:
-    from playwright.sync_api import sync_playwright
+    import orjson
 
-    HAS_PLAYWRIGHT = True
+    _json_loads = orjson.loads
 except Exception:
-    HAS_PLAYWRIGHT = False
+    _json_loads = json.loads
 
 # Stock-related field names (lower-cased) used to determine availability
 _STOCK_KEYS = frozenset(
@@ -36,6 +54,47 @@ _STOCK_KEYS = frozenset(
     }
 )
 
+# dtche[category]=<slug> query parameter (raw or percent-encoded brackets)
+_DTCHE_CATEGORY_RE = re.compile(
+    r"dtche(?:%5B|\[)category(?:%5D|\])=([^&\"'\s<>]+)", re.IGNORECASE
+)
+
+# Output columns of crawl_dutchie; rows are plain tuples in this order
+_COLUMNS = [
+    "Product",
+    "Menu_Type",
+    "Category",
+    "Brand",
+    "THC",
+    "CBD",
+    "Price",
+    "Size",
+    "SKU",
+    "Source",
+    "Source_URL",
+]
+
+
+def _row_key(row: tuple) -> tuple:
+    """(Product, Price, Size) of a row, used for dedup and page signatures."""
+    return row[0], row[6], row[7]
+
+
+def _page_signature(rows: list[tuple]) -> bytes:
+    """
+    Order-insensitive 16-byte digest of a page's (Product, Price, Size)
+    keys, used to spot pagination that keeps returning the same page.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for key in sorted({repr(_row_key(r)) for r in rows}):
+        h.update(key.encode("utf-8", "surrogatepass"))
+        h.update(b"\n")
+    return h.digest()
+
+
+# Categories found via links that make the full-page HTML scan unnecessary
+_MIN_LINK_CATEGORIES = 3
+
 # CSS selectors to wait on so we know the menu has rendered
 _MENU_SELECTORS = [
     "[class*='product-card']",
@@ -47,41 +106,9 @@ _MENU_SELECTORS = [
     "[class*='products-grid']",
 ]
 
-# Age-gate button texts (case-insensitive)
-_AGE_GATE_TEXTS = [
-    "i'm 21",
-    "im 21",
-    "i am 21",
-    "i am 21+",
-    "over 21",
-    "21+",
-    "yes, i'm 21",
-    "yes i'm 21",
-    "i agree",
-    "enter site",
-    "enter the site",
-    "confirm age",
-    "verify age",
-    "i am of legal age",
-    "yes, i am",
-    "yes i am",
-    "yes",
-    "enter",
-]
-
-_AGE_GATE_SELECTORS = [
-    "[class*='age-gate'] button",
-    "[class*='agegate'] button",
-    "[class*='age_gate'] button",
-    "[id*='age-gate'] button",
-    "[id*='agegate'] button",
-    "[class*='age-verification'] button",
-    "[class*='ageVerification'] button",
-    ".age-gate-button",
-    "button[data-testid*='age']",
-    "button[aria-label*='21']",
-    "button[aria-label*='age']",
-]
+# One combined selector: a single wait bounded by one timeout, instead of
+# a full timeout per entry when the menu uses none of them
+_MENU_SELECTOR = ", ".join(_MENU_SELECTORS)
 
 
 # ---------------------------------------------------------------------------
@@ -107,7 +134,7 @@ def _is_in_stock(product: dict) -> bool:
     the product is included (True) so we never silently drop unknown schemas.
     """
     for k, v in product.items():
-        if k.lower() not in _STOCK_KEYS:
+        if lower_key(k) not in _STOCK_KEYS:
             continue
         if isinstance(v, bool):
             return v
@@ -130,7 +157,7 @@ def _is_in_stock(product: dict) -> bool:
             if not isinstance(variant, dict):
                 continue
             for k, v in variant.items():
-                if k.lower() not in _STOCK_KEYS:
+                if lower_key(k) not in _STOCK_KEYS:
                     continue
                 if isinstance(v, bool):
                     if v:
@@ -182,9 +209,10 @@ def _extract_cannabinoid(product: dict, name: str) -> str | None:
 
 def _build_rows_from_product(
     product: dict, source_url: str, menu_type: str | None
-) -> list[dict]:
+) -> list[tuple]:
     """
-    Build one DataFrame row per purchasable variant (size/weight).
+    Build one row (a tuple in ``_COLUMNS`` order) per purchasable variant
+    (size/weight).
     Falls back to a single row at product level if no variants exist.
     """
     name = (
@@ -222,7 +250,7 @@ def _build_rows_from_product(
     )
 
     variants = product.get("variants") or product.get("options") or []
-    rows: list[dict] = []
+    rows: list[tuple] = []
 
     if variants and isinstance(variants, list):
         for variant in variants:
@@ -231,7 +259,7 @@ def _build_rows_from_product(
             # Per-variant stock check
             variant_in_stock = True
             for k, v in variant.items():
-                if k.lower() not in _STOCK_KEYS:
+                if lower_key(k) not in _STOCK_KEYS:
                     continue
                 if isinstance(v, bool):
                     variant_in_stock = v
@@ -265,19 +293,19 @@ def _build_rows_from_product(
             )
 
             rows.append(
-                {
-                    "Product": name,
-                    "Menu_Type": menu_type,
-                    "Category": category,
-                    "Brand": brand,
-                    "THC": thc,
-                    "CBD": cbd,
-                    "Price": price,
-                    "Size": str(size) if size is not None else None,
-                    "SKU": sku,
-                    "Source": "Dutchie GraphQL",
-                    "Source_URL": source_url,
-                }
+                (
+                    name,
+                    menu_type,
+                    category,
+                    brand,
+                    thc,
+                    cbd,
+                    price,
+                    str(size) if size is not None else None,
+                    sku,
+                    "Dutchie GraphQL",
+                    source_url,
+                )
             )
     else:
         # No variants – use product-level price
@@ -286,19 +314,19 @@ def _build_rows_from_product(
             price = price.get("amount") or price.get("value")
 
         rows.append(
-            {
-                "Product": name,
-                "Menu_Type": menu_type,
-                "Category": category,
-                "Brand": brand,
-                "THC": thc,
-                "CBD": cbd,
-                "Price": price,
-                "Size": None,
-                "SKU": str(product_id) if product_id else None,
-                "Source": "Dutchie GraphQL",
-                "Source_URL": source_url,
-            }
+            (
+                name,
+                menu_type,
+                category,
+                brand,
+                thc,
+                cbd,
+                price,
+                None,
+                str(product_id) if product_id else None,
+                "Dutchie GraphQL",
+                source_url,
+            )
         )
 
     return rows
@@ -333,18 +361,48 @@ def _extract_products_from_payload(payload: dict) -> list[dict]:
     return _find_product_list(body)
 
 
+# Keys of GraphQL metadata objects that never hold the product list
+_NON_PRODUCT_KEYS = frozenset(
+    {"__typename", "pageInfo", "facets", "filters", "breadcrumbs", "extensions"}
+)
+
+# Keys that name a product array outright; a product-like list this long
+# directly under one of them is taken without looking further
+_PRODUCT_LIST_KEYS = frozenset({"products", "menuProducts", "edges", "nodes"})
+_PRODUCT_LIST_TARGET = 50
+
+
 def _find_product_list(obj, depth: int = 0, max_depth: int = 6) -> list:
-    """Recursively find the largest list of dicts with a name/title field."""
+    """
+    Recursively find the largest list of dicts with a name/title field,
+    stopping early once a list of ``_PRODUCT_LIST_TARGET`` items is found
+    directly under one of ``_PRODUCT_LIST_KEYS``.
+    """
+    return _search_product_list(obj, depth, max_depth)[0]
+
+
+def _search_product_list(obj, depth: int, max_depth: int) -> tuple[list, bool]:
+    """``_find_product_list`` body; the flag is set once the search can stop."""
     if depth > max_depth:
-        return []
+        return [], False
 
     best: list = []
 
     if isinstance(obj, dict):
-        for v in obj.values():
-            candidate = _find_product_list(v, depth + 1, max_depth)
+        for k, v in obj.items():
+            if k in _NON_PRODUCT_KEYS or not isinstance(v, (dict, list)):
+                continue
+            candidate, done = _search_product_list(v, depth + 1, max_depth)
+            if done:
+                return candidate, True
             if len(candidate) > len(best):
                 best = candidate
+                if (
+                    candidate is v
+                    and k in _PRODUCT_LIST_KEYS
+                    and len(best) >= _PRODUCT_LIST_TARGET
+                ):
+                    return best, True
 
     elif isinstance(obj, list):
         named = sum(
@@ -353,13 +411,15 @@ def _find_product_list(obj, depth: int = 0, max_depth: int = 6) -> list:
             if isinstance(item, dict) and ("name" in item or "title" in item)
         )
         if named >= min(2, len(obj)) and named > 0:
-            return obj
+            return obj, False
         for item in obj:
-            candidate = _find_product_list(item, depth + 1, max_depth)
+            candidate, done = _search_product_list(item, depth + 1, max_depth)
+            if done:
+                return candidate, True
             if len(candidate) > len(best):
                 best = candidate
 
-    return best
+    return best, False
 
 
 def _page_url(base_url: str, category: str | None, page: int) -> str:
@@ -384,29 +444,31 @@ def _discover_categories(page) -> list[str]:
     categories: list[str] = []
     seen: set[str] = set()
 
-    # 1) Links with dtche in href
+    # 1) Links with dtche in href (all hrefs in one round trip)
     try:
-        links = page.query_selector_all("a[href*='dtche']")
-        for link in links:
-            href = link.get_attribute("href") or ""
-            m = re.search(
-                r"dtche(?:%5B|\[)category(?:%5D|\])=([^&\"'\s]+)", href, re.I
-            )
+        hrefs = page.eval_on_selector_all(
+            "a[href*='dtche']", "els => els.map(e => e.getAttribute('href'))"
+        )
+        for href in hrefs:
+            m = _DTCHE_CATEGORY_RE.search(href or "")
             if m:
-                cat = re.sub(r"%20", " ", m.group(1)).strip()
+                cat = m.group(1).replace("%20", " ").strip()
                 if cat and cat not in seen:
                     categories.append(cat)
                     seen.add(cat)
     except Exception:
         pass
 
+    # Serialising the whole DOM is a multi-MB transfer, so the page HTML is
+    # only scanned when the links did not already give a usable menu
+    if len(categories) >= _MIN_LINK_CATEGORIES:
+        return categories
+
     # 2) Scan full page HTML for any dtche[category] occurrences
     try:
         html = page.content()
-        for m in re.finditer(
-            r"dtche(?:%5B|\[)category(?:%5D|\])=([^&\"'\s<>]+)", html, re.I
-        ):
-            cat = re.sub(r"%20", " ", m.group(1)).strip()
+        for m in _DTCHE_CATEGORY_RE.finditer(html):
+            cat = m.group(1).replace("%20", " ").strip()
             if cat and cat not in seen:
                 categories.append(cat)
                 seen.add(cat)
@@ -417,43 +479,243 @@ def _discover_categories(page) -> list[str]:
 
 
 def _bypass_age_gate(page) -> None:
-    """Best-effort 21+ age-gate dismissal (mirrors playwright_helpers logic)."""
-    # 1) CSS selectors
-    for selector in _AGE_GATE_SELECTORS:
-        try:
-            el = page.query_selector(selector)
-            if el and el.is_visible():
-                el.click(timeout=3000)
-                page.wait_for_timeout(1500)
-                return
-        except Exception:
-            pass
-
-    # 2) Text-based matching
-    for text in _AGE_GATE_TEXTS:
-        for tag in ["button", "a", "[role='button']"]:
-            try:
-                locator = page.locator(f"{tag}:has-text('{text}')").first
-                if locator.is_visible(timeout=1000):
-                    locator.click(timeout=3000)
-                    page.wait_for_timeout(1500)
-                    return
-            except Exception:
-                pass
+    """Best-effort 21+ age-gate dismissal (shared playwright_helpers matcher)."""
+    try_bypass_age_gate(page)
 
 
 def _wait_for_menu(page, timeout_ms: int = 8000) -> None:
     """Wait for any of the known menu container selectors to appear."""
-    for selector in _MENU_SELECTORS:
-        try:
-            page.wait_for_selector(selector, timeout=timeout_ms)
-            return
-        except Exception:
-            pass
+    try:
+        page.wait_for_selector(_MENU_SELECTOR, timeout=timeout_ms)
+        return
+    except Exception:
+        pass
     # Final fallback: just wait a bit
     page.wait_for_timeout(3000)
 
 
+# Client-side route change: the menu app re-queries GraphQL without a reload
+_SOFT_NAV_JS = """
+(u) => {
+    window.history.pushState({}, '', u);
+    window.dispatchEvent(new PopStateEvent('popstate'));
+}
+"""
+
+
+def _is_product_query(response) -> bool:
+    """True for the GraphQL response carrying a product listing."""
+    url_lower = response.url.lower()
+    if "graphql" not in url_lower:
+        return False
+    if "filteredproducts" in url_lower:
+        return True
+    try:
+        return "filteredProducts" in (response.request.post_data or "")
+    except Exception:
+        return False
+
+
+def _category_key(name: str) -> str:
+    """Loose form of a category slug or type name: "Edibles" ~ "edible"."""
+    return name.strip().lower().rstrip("s")
+
+
+def _is_page_query(response, category: str, page_index: int | None) -> bool:
+    """
+    True for the product query of *category* at GraphQL ``page``
+    *page_index* (any page when None).  Responses whose variables cannot
+    be read are judged by `_is_product_query` alone.
+    """
+    if not _is_product_query(response):
+        return False
+    try:
+        variables = _request_variables(response.request)
+    except Exception:
+        variables = None
+    if not isinstance(variables, dict):
+        return True
+    if page_index is not None and variables.get("page") != page_index:
+        return False
+    products_filter = variables.get("productsFilter")
+    if not isinstance(products_filter, dict):
+        return True
+    # Specials carousels reuse the same query
+    if products_filter.get("isOnSpecial") or products_filter.get("specialId"):
+        return False
+    types = products_filter.get("types") or []
+    want = _category_key(category)
+    return any(isinstance(t, str) and _category_key(t) == want for t in types)
+
+
+def _soft_navigate(
+    page,
+    nav_url: str,
+    category: str,
+    page_index: int | None = None,
+    timeout_ms: int = 5000,
+) -> bool:
+    """
+    Move the already-loaded menu to *nav_url* via the History API and wait
+    for the product query of *category* / *page_index* instead of
+    reloading the page.  Returns False when the app did not react, so the
+    caller can fall back to goto().
+    """
+    try:
+        with page.expect_response(
+            lambda r: _is_page_query(r, category, page_index), timeout=timeout_ms
+        ) as info:
+            page.evaluate(_SOFT_NAV_JS, nav_url)
+        # Wait for the body so the response listener has the full page
+        info.value.body()
+        return True
+    except Exception:
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Direct GraphQL replay
+# ---------------------------------------------------------------------------
+# Rendering each category page in Chromium costs several seconds of fixed
+# waits.  Once the browser has produced one product query, later pages are
+# fetched by re-sending that request with new page/category variables; the
+# browser is only used again when a replay is not possible or fails.
+
+# Categories replayed concurrently; kept low to stay polite to Dutchie's API
+_REPLAY_WORKERS = 4
+
+# Request headers that must not be copied onto a replayed request
+_REPLAY_DROP_HEADERS = frozenset({"host", "content-length", "accept-encoding"})
+
+# dtche[category] URL slug -> productsFilter.types value.  Dutchie filters on
+# display names, several of which are singular; unknown slugs are title-cased.
+_CATEGORY_TYPES = {
+    "flower": "Flower",
+    "pre-rolls": "Pre-Rolls",
+    "vaporizers": "Vaporizers",
+    "concentrates": "Concentrate",
+    "edibles": "Edible",
+    "tinctures": "Tincture",
+    "topicals": "Topicals",
+    "cbd": "CBD",
+    "accessories": "Accessories",
+    "apparel": "Apparel",
+    "seeds": "Seeds",
+    "clones": "Clones",
+}
+
+
+def _request_variables(request, body=None):
+    """
+    The JSON ``variables`` of a GraphQL request: the query parameter for
+    GET, else the field of the (already decoded, if given) POST body.
+    """
+    if request.method.upper() == "GET":
+        query = dict(parse_qsl(urlsplit(request.url).query))
+        return json.loads(query.get("variables") or "null")
+    if body is None:
+        body = json.loads(request.post_data or "null")
+    return body.get("variables") if isinstance(body, dict) else None
+
+
+def _capture_replay_template(request) -> dict | None:
+    """
+    Snapshot a Playwright GraphQL request (method, URL, headers, variables)
+    so it can be re-sent without the browser.  Returns None when the
+    request carries no JSON ``variables`` object.
+    """
+    try:
+        method = request.method.upper()
+        body = None if method == "GET" else json.loads(request.post_data or "null")
+        variables = _request_variables(request, body)
+        headers = {
+            k: v
+            for k, v in request.all_headers().items()
+            if not k.startswith(":") and k.lower() not in _REPLAY_DROP_HEADERS
+        }
+    except Exception:
+        return None
+    if not isinstance(variables, dict) or "page" not in variables:
+        return None
+    return {
+        "method": method,
+        "url": request.url,
+        "headers": headers,
+        "body": body,
+        "variables": variables,
+    }
+
+
+def _replay_variables(template: dict, category: str | None, page: int) -> dict | None:
+    """
+    Variables for *category* / 1-based *page*, derived from the captured
+    (first-page) request; None when the query has no filter to set a
+    category on.
+    """
+    variables = json.loads(json.dumps(template["variables"]))
+    variables["page"] = template["variables"]["page"] + page - 1
+    if category:
+        products_filter = variables.get("productsFilter")
+        if not isinstance(products_filter, dict):
+            return None
+        slug = category.strip().lower()
+        products_filter["types"] = [_CATEGORY_TYPES.get(slug) or category.title()]
+    return variables
+
+
+def _replay_graphql(
+    session: requests.Session,
+    template: dict,
+    category: str | None,
+    page: int,
+    timeout: float,
+) -> dict | None:
+    """
+    Re-send the captured GraphQL request for *category* / *page* and
+    return a payload dict shaped like the browser captures, or None if
+    the request could not be built or did not return JSON.
+    """
+    variables = _replay_variables(template, category, page)
+    if variables is None:
+        return None
+    encoded = json.dumps(variables, separators=(",", ":"))
+    try:
+        if template["method"] == "GET":
+            parts = urlsplit(template["url"])
+            query = dict(parse_qsl(parts.query))
+            query["variables"] = encoded
+            resp = session.get(
+                urlunsplit(parts._replace(query=urlencode(query))),
+                headers=template["headers"],
+                timeout=timeout,
+            )
+        else:
+            body = dict(template["body"])
+            body["variables"] = variables
+            resp = session.post(
+                template["url"],
+                data=json.dumps(body, separators=(",", ":")),
+                headers=template["headers"],
+                timeout=timeout,
+            )
+        if resp.status_code >= 400:
+            return None
+        raw = resp.content
+        data = _json_loads(raw)
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {
+        "url": resp.url,
+        "status": resp.status_code,
+        "content_type": resp.headers.get("content-type", ""),
+        "json": data,
+        "data": data,
+        "text_snippet": raw[:200].decode("utf-8", "replace"),
+    }
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -468,8 +730,9 @@ def crawl_dutchie(
     """
     Full Dutchie menu crawler.
 
-    Launches a headless Chromium browser, attaches a GraphQL response
-    listener *before* navigation, discovers all category slugs from the
+    Opens a browser context on the shared headless Chromium
+    (``run_with_browser``), attaches a GraphQL response listener *before*
+    navigation, discovers all category slugs from the
     rendered page, and iterates through each category page-by-page until
     no new products are found or a page signature repeats.
 
@@ -494,19 +757,20 @@ def crawl_dutchie(
         "per_page_counts": {},
         "parse_notes": [],
         "graphql_details": [],
+        "replayed_count": 0,
     }
 
     if not HAS_PLAYWRIGHT:
         debug_info["parse_notes"].append("Playwright not available – install with: playwright install chromium")
         return pd.DataFrame(), debug_info
 
-    all_rows: list[dict] = []
+    all_rows: list[tuple] = []
     seen_keys: set[tuple] = set()
 
-    def _dedup_and_add(rows: list[dict]) -> int:
+    def _dedup_and_add(rows: list[tuple]) -> int:
         added = 0
         for row in rows:
-            key = (row.get("Product"), row.get("Price"), row.get("Size"))
+            key = _row_key(row)
             if key not in seen_keys:
                 seen_keys.add(key)
                 all_rows.append(row)
@@ -515,6 +779,8 @@ def crawl_dutchie(
 
     # Shared captured-response list – appended to by the listener below
     captured: list[dict] = []
+    # First product query seen by the listener, re-sent directly for later pages
+    replay: dict = {"template": None}
 
     def _on_response(response) -> None:
         """Capture every GraphQL response, regardless of Content-Type header."""
@@ -525,10 +791,10 @@ def crawl_dutchie(
             return
         ctype = (response.headers.get("content-type") or "").lower()
         try:
-            # Always use text() → json.loads() so we are not gated on
+            # Always decode the raw body ourselves so we are not gated on
             # the Content-Type header being exactly 'application/json'
-            text = response.text()
-            body = json.loads(text)
+            raw = response.body()
+            body = _json_loads(raw)
             if not body:
                 return
             entry = {
@@ -537,16 +803,18 @@ def crawl_dutchie(
                 "content_type": ctype,
                 "json": body,
                 "data": body,
-                "text_snippet": text[:200],
+                "text_snippet": raw[:200].decode("utf-8", "replace"),
             }
             captured.append(entry)
+            if replay["template"] is None and _extract_products_from_payload(entry):
+                replay["template"] = _capture_replay_template(response.request)
             debug_info["captured_count"] += 1
             debug_info["captured_urls"].append(resp_url)
             debug_info["graphql_details"].append(
                 {
                     "url": resp_url,
                     "status": response.status,
-                    "body_length": len(text),
+                    "body_length": len(raw),
                     "json_ok": True,
                 }
             )
@@ -561,17 +829,27 @@ def crawl_dutchie(
                 }
             )
 
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                viewport={"width": 1400, "height": 900},
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/123.0.0.0 Safari/537.36"
-                ),
-            )
+    def _rows_from_payloads(payloads: list[dict]) -> list[tuple]:
+        rows: list[tuple] = []
+        for payload in payloads:
+            for prod in _extract_products_from_payload(payload):
+                if not _is_in_stock(prod):
+                    continue
+                rows.extend(_build_rows_from_product(prod, url, menu_type))
+        return rows
+
+    def _crawl_with_browser(browser, session: requests.Session) -> None:
+        # Own context on the shared browser; the page stays on this worker
+        # thread, only the replay session is used from the thread pool
+        context = browser.new_context(
+            viewport={"width": 1400, "height": 900},
+            user_agent=(
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/123.0.0.0 Safari/537.36"
+            ),
+        )
+        try:
             # Pre-set localStorage age-gate keys before any page loads
             context.add_init_script(
                 """
@@ -584,6 +862,10 @@ def crawl_dutchie(
                 } catch(e) {}
                 """
             )
+            context.add_cookies(_age_gate_cookies(url))
+            context.route("**/*", _block_heavy_resources)
+            context.set_default_timeout(_DEFAULT_ACTION_TIMEOUT_MS)
+            context.set_default_navigation_timeout(timeout)
             page = context.new_page()
             # *** Attach listener BEFORE first navigation ***
             page.on("response", _on_response)
@@ -608,27 +890,28 @@ def crawl_dutchie(
                 debug_info["parse_notes"].append(
                     "No categories discovered; parsing initial page responses"
                 )
-                initial_count = 0
-                for payload in captured:
-                    products = _extract_products_from_payload(payload)
-                    rows: list[dict] = []
-                    for prod in products:
-                        if not _is_in_stock(prod):
-                            continue
-                        rows.extend(
-                            _build_rows_from_product(prod, url, menu_type)
-                        )
-                    initial_count += _dedup_and_add(rows)
+                initial_count = _dedup_and_add(_rows_from_payloads(captured))
                 debug_info["per_page_counts"]["initial"] = initial_count
             else:
-                for cat in categories:
-                    cat_total = 0
-                    prev_signatures: set = set()
-
-                    for pg in range(1, max_pages + 1):
-                        cap_before = len(captured)
-                        nav_url = _page_url(url, cat, pg)
-
+                # Cleared after the first page the menu app does not route
+                # client-side, so later pages go straight to goto()
+                soft_nav = {"ok": True}
+
+                # Payloads are parsed and dropped page by page, so at most one
+                # page's JSON is held at a time (the initial load's
+                # responses are not needed once categories are known)
+                captured.clear()
+
+                def _browser_page_rows(cat: str, pg: int) -> list[tuple]:
+                    captured.clear()
+                    nav_url = _page_url(url, cat, pg)
+                    if soft_nav["ok"]:
+                        # GraphQL page numbering follows the captured query
+                        page_index = None
+                        if replay["template"] is not None:
+                            page_index = replay["template"]["variables"]["page"] + pg - 1
+                        soft_nav["ok"] = _soft_navigate(page, nav_url, cat, page_index)
+                    if not soft_nav["ok"]:
                         page.goto(
                             nav_url,
                             wait_until="domcontentloaded",
@@ -637,61 +920,122 @@ def crawl_dutchie(
                         page.wait_for_timeout(2000)
                         _wait_for_menu(page)
                         page.wait_for_timeout(1000)
-
-                        # Only look at responses captured during this navigation
-                        new_captures = captured[cap_before:]
-                        page_products: list[dict] = []
-                        for payload in new_captures:
-                            raw_products = _extract_products_from_payload(payload)
-                            for prod in raw_products:
-                                if not _is_in_stock(prod):
-                                    continue
-                                page_products.extend(
-                                    _build_rows_from_product(
-                                        prod, url, menu_type
-                                    )
+                    # Only look at responses captured during this navigation
+                    rows = _rows_from_payloads(captured)
+                    captured.clear()
+                    return rows
+
+                def _replay_category(cat: str) -> tuple[list[list[tuple]], int | None]:
+                    """
+                    Page through *cat* by replaying the captured query.
+                    Returns the rows of each page fetched and the page the
+                    browser should resume from (None when done).
+                    """
+                    pages: list[list[tuple]] = []
+                    signatures: set[bytes] = set()
+                    for pg in range(1, max_pages + 1):
+                        payload = _replay_graphql(
+                            session, replay["template"], cat, pg, timeout / 1000
+                        )
+                        if payload is None:
+                            return pages, pg
+                        rows = _rows_from_payloads([payload])
+                        # An empty first page may just mean the category
+                        # filter did not translate — let the browser decide
+                        if pg == 1 and not rows:
+                            return pages, pg
+                        pages.append(rows)
+                        sig = _page_signature(rows)
+                        if not rows or sig in signatures:
+                            return pages, None
+                        signatures.add(sig)
+                    return pages, None
+
+                def _add_page(
+                    cat: str,
+                    pg: int,
+                    page_products: list[tuple],
+                    prev_signatures: set[bytes],
+                ) -> int | None:
+                    """Record one page; returns rows added, or None to stop paging."""
+                    page_key = f"{cat}_page{pg}"
+
+                    if not page_products:
+                        debug_info["parse_notes"].append(
+                            f"Category '{cat}' page {pg}: 0 products – stopping"
+                        )
+                        debug_info["per_page_counts"][page_key] = 0
+                        return None
+
+                    # Stable-signature check: stop if we see the same
+                    # set of (name, price, size) tuples again
+                    sig = _page_signature(page_products)
+                    if sig in prev_signatures:
+                        debug_info["parse_notes"].append(
+                            f"Category '{cat}' page {pg}: repeated signature – stopping"
+                        )
+                        debug_info["per_page_counts"][page_key] = 0
+                        return None
+                    prev_signatures.add(sig)
+
+                    added = _dedup_and_add(page_products)
+                    debug_info["per_page_counts"][page_key] = added
+                    return added
+
+                # Replayed categories are independent HTTP requests, so they
+                # run concurrently; the browser (bound to this thread) picks up
+                # whatever the replays could not fetch, in category order
+                with ThreadPoolExecutor(max_workers=_REPLAY_WORKERS) as pool:
+                    replays = {}
+                    if replay["template"] is not None:
+                        replays = {cat: pool.submit(_replay_category, cat) for cat in categories}
+
+                    for cat in categories:
+                        cat_total = 0
+                        prev_signatures: set[bytes] = set()
+                        if cat in replays:
+                            pages, resume_pg = replays[cat].result()
+                        else:
+                            pages, resume_pg = [], 1
+
+                        for pg, page_products in enumerate(pages, start=1):
+                            debug_info["replayed_count"] += 1
+                            added = _add_page(cat, pg, page_products, prev_signatures)
+                            if added is None:
+                                resume_pg = None
+                                break
+                            cat_total += added
+
+                        if resume_pg is not None:
+                            for pg in range(resume_pg, max_pages + 1):
+                                added = _add_page(
+                                    cat, pg, _browser_page_rows(cat, pg), prev_signatures
                                 )
+                                if added is None:
+                                    break
+                                cat_total += added
 
-                        page_key = f"{cat}_page{pg}"
-
-                        if not page_products:
-                            debug_info["parse_notes"].append(
-                                f"Category '{cat}' page {pg}: 0 products – stopping"
-                            )
-                            debug_info["per_page_counts"][page_key] = 0
-                            break
-
-                        # Stable-signature check: stop if we see the same
-                        # set of (name, price, size) tuples again
-                        sig = frozenset(
-                            (r.get("Product"), r.get("Price"), r.get("Size"))
-                            for r in page_products
+                        debug_info["parse_notes"].append(
+                            f"Category '{cat}': {cat_total} unique rows added"
                         )
-                        if sig in prev_signatures:
-                            debug_info["parse_notes"].append(
-                                f"Category '{cat}' page {pg}: repeated signature – stopping"
-                            )
-                            debug_info["per_page_counts"][page_key] = 0
-                            break
-                        prev_signatures.add(sig)
-
-                        added = _dedup_and_add(page_products)
-                        cat_total += added
-                        debug_info["per_page_counts"][page_key] = added
 
+                if debug_info["replayed_count"]:
                     debug_info["parse_notes"].append(
-                        f"Category '{cat}': {cat_total} unique rows added"
+                        f"Fetched {debug_info['replayed_count']} pages by replaying "
+                        "the GraphQL query directly"
                     )
+        finally:
+            context.close()
 
-            browser.close()
-
+    try:
+        with requests.Session() as session:
+            run_with_browser(_crawl_with_browser, session)
     except Exception as exc:
         debug_info["parse_notes"].append(f"Crawler error: {exc}")
 
     if not all_rows:
         return pd.DataFrame(), debug_info
 
-    df = pd.DataFrame(all_rows)
-    if "Price" in df.columns:
-        df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
+    df = pd.DataFrame.from_records(all_rows, columns=_COLUMNS)
+    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
     return df, debug_info
@@ -3,6 +3,7 @@ Dutchie (and generic GraphQL) product data parser.
 
 Provides:
 - parse_dutchie_responses(payloads) -> pd.DataFrame
+- lower_key(k) -> str
 
 The parser recursively searches JSON payloads for objects that look like
 products (have a name/title field, optionally a price) and builds a
@@ -11,6 +12,7 @@ normalised DataFrame with columns: Product, Category, Price, THC, Source.
 
 import re
 
+import numpy as np
 import pandas as pd
 
 # Lower-cased key names recognised as product name fields
@@ -40,57 +42,88 @@ _CATEGORY_KEYS = frozenset(
     {"category", "type", "producttype", "subcategory", "kind", "menutype"}
 )
 
+# Output columns of parse_dutchie_responses
+_COLUMNS = ["Product", "Category", "Price", "THC", "Source"]
 
-def _extract_name(obj: dict) -> str | None:
-    for k, v in obj.items():
-        if k.lower() in _NAME_KEYS and isinstance(v, str) and len(v.strip()) > 1:
-            return v.strip()
-    return None
+# Keys whose values are never product records (images carry "title"/"name"
+# alt text, descriptions can be large HTML blobs)
+_SKIP_KEYS = frozenset(
+    {"description", "descriptionHtml", "image", "images", "seo", "svg", "raw"}
+)
 
+_CONTAINERS = (dict, list)
 
-def _extract_price(obj: dict) -> float | None:
-    for k, v in obj.items():
-        if k.lower() not in _PRICE_KEYS:
-            continue
-        if isinstance(v, (int, float)) and v > 0:
-            return float(v)
-        if isinstance(v, str):
-            m = re.search(r"\d+\.?\d*", v.replace(",", ""))
-            if m:
-                try:
-                    return float(m.group(0))
-                except ValueError:
-                    pass
-    return None
+# First number in a price / THC string (e.g. "$1,020.00", "22.5%")
+_NUM_RE = re.compile(r"\d+\.?\d*")
 
+_NAN = float("nan")
 
-def _extract_thc(obj: dict) -> float | None:
-    for k, v in obj.items():
-        if k.lower() not in _THC_KEYS:
-            continue
-        if isinstance(v, (int, float)):
-            return float(v)
-        if isinstance(v, str):
-            m = re.search(r"(\d+\.?\d*)", v)
-            if m:
-                try:
-                    return float(m.group(1))
-                except ValueError:
-                    pass
+# Lower-cased JSON keys, memoised: payloads reuse a few dozen field names
+# across thousands of objects.  Capped so odd payloads (id-keyed maps)
+# cannot grow it without bound.
+_LOWER_KEYS_MAX = 4096
+
+
+class _LowerKeys(dict):
+    """Key -> key.lower(); a miss is lowered and stored while under the cap."""
+
+    def __missing__(self, k: str) -> str:
+        lk = k.lower()
+        if len(self) < _LOWER_KEYS_MAX:
+            self[k] = lk
+        return lk
+
+
+_LOWER_KEYS = _LowerKeys()
+
+# lower_key(k) -> k.lower(), memoised.  The bound dict lookup serves hits in
+# C; a def wrapper around the memo costs more per key than lower() itself.
+lower_key = _LOWER_KEYS.__getitem__
+
+
+def _parse_number(v) -> float | None:
+    """First number in a price / THC string, or None."""
+    m = _NUM_RE.search(v)
+    if m:
+        try:
+            return float(m.group(0))
+        except ValueError:
+            pass
     return None
 
 
-def _extract_category(obj: dict) -> str | None:
+def _extract_fields(obj: dict) -> tuple:
+    """
+    Pull (name, category, price, thc) out of *obj* in one pass over its
+    keys, lower-casing each key once.  For every field the first key (in
+    dict order) holding a usable value wins.
+    """
+    name = category = price = thc = None
     for k, v in obj.items():
-        if k.lower() not in _CATEGORY_KEYS:
-            continue
-        if isinstance(v, str) and v.strip():
-            return v.strip()
-        if isinstance(v, dict):
-            inner = v.get("name") or v.get("title")
-            if inner and isinstance(inner, str):
-                return inner.strip()
-    return None
+        lk = lower_key(k)
+        if lk in _NAME_KEYS:
+            if name is None and isinstance(v, str) and len(v.strip()) > 1:
+                name = v.strip()
+        elif lk in _PRICE_KEYS:
+            if price is None:
+                if isinstance(v, (int, float)) and v > 0:
+                    price = float(v)
+                elif isinstance(v, str):
+                    price = _parse_number(v.replace(",", ""))
+        elif lk in _THC_KEYS:
+            if thc is None:
+                if isinstance(v, (int, float)):
+                    thc = float(v)
+                elif isinstance(v, str):
+                    thc = _parse_number(v)
+        elif lk in _CATEGORY_KEYS and category is None:
+            if isinstance(v, str) and v.strip():
+                category = v.strip()
+            elif isinstance(v, dict):
+                inner = v.get("name") or v.get("title")
+                if inner and isinstance(inner, str):
+                    category = inner.strip()
+    return name, category, price, thc
 
 
 def _search_for_products(obj, depth: int = 0, max_depth: int = 8) -> list:
@@ -108,24 +141,23 @@ def _search_for_products(obj, depth: int = 0, max_depth: int = 8) -> list:
     results: list[dict] = []
 
     if isinstance(obj, dict):
-        name = _extract_name(obj)
+        name, category, price, thc = _extract_fields(obj)
         if name:
             results.append(
-                {
-                    "Product": name,
-                    "Category": _extract_category(obj),
-                    "Price": _extract_price(obj),
-                    "THC": _extract_thc(obj),
-                }
+                {"Product": name, "Category": category, "Price": price, "THC": thc}
             )
-        # Always recurse into dict values
-        for v in obj.values():
-            if isinstance(v, (dict, list)):
+        # Recurse into nested values, except media/SEO blobs whose
+        # name/title fields are not products
+        for k, v in obj.items():
+            if k in _SKIP_KEYS:
+                continue
+            if isinstance(v, _CONTAINERS):
                 results.extend(_search_for_products(v, depth + 1, max_depth))
 
     elif isinstance(obj, list):
         for item in obj:
-            results.extend(_search_for_products(item, depth + 1, max_depth))
+            if isinstance(item, _CONTAINERS):
+                results.extend(_search_for_products(item, depth + 1, max_depth))
 
     return results
 
@@ -146,7 +178,13 @@ def parse_dutchie_responses(payloads: list) -> pd.DataFrame:
         DataFrame with columns: Product, Category, Price, THC, Source.
         Empty DataFrame (with those columns) if no products are found.
     """
-    rows: list[dict] = []
+    # One buffer per output column; Price/THC hold floats (NaN when absent)
+    # so the frame is built without a type-inference or to_numeric pass
+    names: list[str] = []
+    categories: list = []
+    prices: list[float] = []
+    thcs: list[float] = []
+    sources: list[str] = []
     # Use (name, price) composite key to allow same-named products at different price points
     seen_keys: set[tuple] = set()
 
@@ -172,23 +210,27 @@ def parse_dutchie_responses(payloads: list) -> pd.DataFrame:
             if dedup_key in seen_keys:
                 continue
             seen_keys.add(dedup_key)
-            rows.append(
-                {
-                    "Product": name,
-                    "Category": p["Category"],
-                    "Price": p["Price"],
-                    "THC": p["THC"],
-                    "Source": source_label,
-                }
-            )
-
-    if not rows:
-        return pd.DataFrame(columns=["Product", "Category", "Price", "THC", "Source"])
-
-    df = pd.DataFrame(rows)
-    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
-    df["THC"] = pd.to_numeric(df["THC"], errors="coerce")
-    return df
+            price = p["Price"]
+            thc = p["THC"]
+            names.append(name)
+            categories.append(p["Category"])
+            prices.append(_NAN if price is None else price)
+            thcs.append(_NAN if thc is None else thc)
+            sources.append(source_label)
+
+    if not names:
+        return pd.DataFrame(columns=_COLUMNS)
+
+    return pd.DataFrame(
+        {
+            "Product": names,
+            "Category": categories,
+            "Price": np.asarray(prices, dtype="float64"),
+            "THC": np.asarray(thcs, dtype="float64"),
+            "Source": sources,
+        },
+        columns=_COLUMNS,
+    )
 
 
 # Alias so callers can use the name from the problem spec
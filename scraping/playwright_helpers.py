@@ -4,13 +4,28 @@ Playwright-based browser helpers for menu scraping.
 Provides:
 - browser_fetch(url) -> (html, captured_responses, final_url)
 - try_bypass_age_gate(page) -> bool
+- run_with_browser(fn, *args, **kwargs) -> fn(browser, *args, **kwargs)
 
 Requires playwright to be installed:  playwright install chromium
 """
 
+import atexit
 import json
 import os
+import queue
+import re
 import subprocess
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+
+# Captured bodies are decoded straight from bytes; orjson when installed
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except Exception:
+    _json_loads = json.loads
 
 try:
     from playwright.sync_api import sync_playwright
@@ -57,6 +72,104 @@ def auto_install_playwright_chromium(timeout: int = 120) -> bool:
     except Exception:
         return False
 
+
+# ---------------------------------------------------------------------------
+# Shared browser
+# ---------------------------------------------------------------------------
+# Playwright's sync API objects may only be used from the thread that created
+# them, and Streamlit runs every rerun on a fresh thread.  So instead of a
+# module-level browser, a few long-lived worker threads each own one
+# Playwright instance + Chromium process and run submitted jobs against it.
+# Callers open their own context per job, which keeps cookies/storage
+# isolated while skipping the 1–3 s Chromium cold start.
+
+
+def _browser_worker_count(default: int = 2) -> int:
+    """Number of browser workers, overridable via ``PLAYWRIGHT_WORKERS``."""
+    try:
+        return max(1, int(os.environ.get("PLAYWRIGHT_WORKERS", default)))
+    except ValueError:
+        return default
+
+
+# Each worker is one Chromium process, so this is also the number of pages
+# rendered concurrently when a batch scan fans out over run_with_browser
+_BROWSER_WORKERS = _browser_worker_count()
+
+_browser_jobs: queue.Queue = queue.Queue()
+_browser_threads: list[threading.Thread] = []
+_browser_threads_lock = threading.Lock()
+
+
+def _browser_worker() -> None:
+    """Own one Playwright/Chromium pair and run jobs until a None sentinel."""
+    pw = None
+    browser = None
+    while True:
+        job = _browser_jobs.get()
+        if job is None:
+            break
+        fn, args, kwargs, future = job
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            if browser is None or not browser.is_connected():
+                if pw is None:
+                    pw = sync_playwright().start()
+                browser = pw.chromium.launch(headless=True)
+            future.set_result(fn(browser, *args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    # Tear down on the owning thread (required by the sync API)
+    try:
+        if browser is not None:
+            browser.close()
+    except Exception:
+        pass
+    try:
+        if pw is not None:
+            pw.stop()
+    except Exception:
+        pass
+
+
+def _start_browser_workers() -> None:
+    with _browser_threads_lock:
+        if _browser_threads:
+            return
+        for i in range(_BROWSER_WORKERS):
+            t = threading.Thread(
+                target=_browser_worker, name=f"playwright-{i}", daemon=True
+            )
+            t.start()
+            _browser_threads.append(t)
+
+
+def _shutdown_browser_workers() -> None:
+    for _ in _browser_threads:
+        _browser_jobs.put(None)
+    for t in _browser_threads:
+        t.join(timeout=5)
+
+
+atexit.register(_shutdown_browser_workers)
+
+
+def run_with_browser(fn, *args, **kwargs):
+    """
+    Call ``fn(browser, *args, **kwargs)`` on a shared, already-launched
+    headless Chromium and return its result (exceptions are re-raised here).
+
+    *fn* should create and close its own ``browser.new_context()``; it must
+    not call ``run_with_browser`` itself.
+    """
+    _start_browser_workers()
+    future: Future = Future()
+    _browser_jobs.put((fn, args, kwargs, future))
+    return future.result()
+
+
 # Common confirmation text found on 21+ age gates (matched case-insensitively)
 _AGE_GATE_TEXTS = [
     "i'm 21",
@@ -94,65 +207,188 @@ _AGE_GATE_SELECTORS = [
     "button[aria-label*='age']",
 ]
 
-# Domains/patterns for which we always capture JSON responses
-_CAPTURE_URL_PATTERNS = [
-    "dutchie",
-    "graphql",
-    "iheartjane",
-    "jane.menu",
-    "weedmaps",
-    "dispenseapp",
-    "dispense.io",
-    "tymberapp",
-    "/api/",
-    "/menu/",
-    "/products",
-    "/catalog",
+
+# One combined selector instead of a query per entry
+_AGE_GATE_SELECTOR = ", ".join(_AGE_GATE_SELECTORS)
+
+# Elements whose text is matched against the confirmation phrases
+_AGE_GATE_CLICKABLE = "button, a, [role='button']"
+
+# The bare words match plenty of ordinary links ("Center", "yesterday"), so
+# they are only tried once no specific 21+ phrase is on the page
+_AGE_GATE_GENERIC_TEXTS = ("yes", "enter")
+_AGE_GATE_TEXT_TIERS = [
+    [t for t in _AGE_GATE_TEXTS if t not in _AGE_GATE_GENERIC_TEXTS],
+    list(_AGE_GATE_GENERIC_TEXTS),
 ]
 
+# Attribute the in-page matcher puts on the element Playwright should click
+_AGE_GATE_MARK = "data-age-gate-target"
+
+# Runs the whole selector + phrase search in one evaluate() and marks the
+# first visible match; the click itself stays a real Playwright click
+_AGE_GATE_FIND_JS = """
+([selector, clickable, tiers, mark]) => {
+    const visible = (el) =>
+        (el.offsetWidth || el.offsetHeight || el.getClientRects().length) &&
+        getComputedStyle(el).visibility !== 'hidden';
+    const pick = (el) => { el.setAttribute(mark, '1'); return true; };
+    document.querySelectorAll(`[${mark}]`).forEach((el) => el.removeAttribute(mark));
+    for (const el of document.querySelectorAll(selector)) {
+        if (visible(el)) return pick(el);
+    }
+    const candidates = [...document.querySelectorAll(clickable)].filter(visible);
+    for (const texts of tiers) {
+        for (const el of candidates) {
+            const text = (el.innerText || el.textContent || '').toLowerCase();
+            if (texts.some((t) => text.includes(t))) return pick(el);
+        }
+    }
+    return false;
+}
+"""
+
+
+# Cookies commonly set by age gates once confirmed (the cookie-side twin of
+# the localStorage keys pre-set by the init script); seeding them lets
+# cookie-checking gates never render, so no click is needed
+_AGE_GATE_COOKIES = (
+    ("ageVerified", "true"),
+    ("age_verified", "true"),
+    ("isAgeVerified", "true"),
+    ("over21", "true"),
+    ("ageGatePassed", "true"),
+)
+
+
+def _age_gate_cookies(url: str) -> list[dict]:
+    """Playwright cookie dicts for _AGE_GATE_COOKIES, site-wide on *url*'s host."""
+    host = urlsplit(url).hostname
+    if not host:
+        return []
+    return [
+        {"name": n, "value": v, "domain": host, "path": "/"}
+        for n, v in _AGE_GATE_COOKIES
+    ]
+
+
+# Resource types the scrapers never read; stylesheets are kept because
+# age-gate visibility checks and menu-ready selectors depend on layout
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
+# Analytics / tag-manager beacons
+_TRACKER_RE = re.compile(
+    r"google-analytics|googletagmanager|segment\.io|hotjar|fullstory|facebook\.com/tr"
+)
+
+
+def _block_heavy_resources(route) -> None:
+    """Playwright route handler: abort images/fonts/media and trackers."""
+    request = route.request
+    if request.resource_type in _BLOCKED_RESOURCE_TYPES or _TRACKER_RE.search(
+        request.url
+    ):
+        route.abort()
+    else:
+        route.continue_()
+
+
+# Upper bound on waiting for the first networkidle after navigation
+_SETTLE_TIMEOUT_MS = 5000
+
+# Infinite-scroll menus: pause per scroll step, and a cap on the steps
+_SCROLL_PAUSE_MS = 300
+_SCROLL_MAX_STEPS = 20
+
+# Scroll to the bottom repeatedly; stop after two steps without the page
+# getting taller (or at the step cap) — one CDP call for the whole loop
+_SCROLL_TO_END_JS = """
+async ([maxSteps, pauseMs]) => {
+    let last = 0;
+    let stable = 0;
+    for (let i = 0; i < maxSteps && stable < 2; i++) {
+        window.scrollTo(0, document.body.scrollHeight);
+        await new Promise((r) => setTimeout(r, pauseMs));
+        const height = document.body.scrollHeight;
+        stable = height === last ? stable + 1 : 0;
+        last = height;
+    }
+}
+"""
+
+
+def _wait_for_network_idle(page, timeout_ms: int) -> None:
+    """Wait for networkidle, giving up quietly after *timeout_ms*."""
+    try:
+        page.wait_for_load_state("networkidle", timeout=timeout_ms)
+    except Exception:
+        pass
+
+
+# Upper bound for Playwright calls that do not pass their own timeout, so
+# no single step can use Playwright's 30 s default
+_DEFAULT_ACTION_TIMEOUT_MS = 5000
+
+# Bodies larger than this (schema introspection dumps, bulk exports) are
+# not decoded
+_MAX_CAPTURE_BYTES = 20_000_000
+
+# Per-fetch budget for captured responses, so an SPA that re-requests its
+# catalog on every route change cannot pin unbounded memory
+_MAX_CAPTURED_ENTRIES = 50
+_MAX_CAPTURED_TOTAL_BYTES = 64 * 1024 * 1024
+
+
+def _click_age_gate(page) -> bool:
+    """Find the age-gate control in-page and click it; True if clicked."""
+    try:
+        found = page.evaluate(
+            _AGE_GATE_FIND_JS,
+            [
+                _AGE_GATE_SELECTOR,
+                _AGE_GATE_CLICKABLE,
+                _AGE_GATE_TEXT_TIERS,
+                _AGE_GATE_MARK,
+            ],
+        )
+        if not found:
+            return False
+        target = f"[{_AGE_GATE_MARK}]"
+        page.click(target, timeout=3000)
+        # Done as soon as the clicked control goes away, rather than after
+        # a fixed sleep; a gate that lingers gets a short grace period
+        try:
+            page.wait_for_selector(target, state="hidden", timeout=2000)
+        except Exception:
+            page.wait_for_timeout(300)
+        return True
+    except Exception:
+        return False
+
 
 def try_bypass_age_gate(page) -> bool:
     """
     Best-effort attempt to dismiss 21+ age verification gates.
 
     Strategy:
-    1. Pre-set common localStorage age-verified keys.
+    1. Pre-set common localStorage age-verified keys and cookies (done by
+       browser_fetch before navigation).
     2. Try clicking buttons/links matched by CSS selectors for age-gate components.
     3. Try clicking buttons/links whose visible text matches common confirmation phrases.
 
     Returns True if an element was clicked, False otherwise.
     """
-    # 1) Try specific CSS selectors
-    for selector in _AGE_GATE_SELECTORS:
-        try:
-            el = page.query_selector(selector)
-            if el and el.is_visible():
-                el.click(timeout=3000)
-                page.wait_for_timeout(1500)
-                return True
-        except Exception:
-            pass
-
-    # 2) Try text-based matching for buttons and links
-    for text in _AGE_GATE_TEXTS:
-        for tag in ["button", "a", "[role='button']"]:
-            try:
-                locator = page.locator(f"{tag}:has-text('{text}')").first
-                if locator.is_visible(timeout=1000):
-                    locator.click(timeout=3000)
-                    page.wait_for_timeout(1500)
-                    return True
-            except Exception:
-                pass
-
-    return False
+    return _click_age_gate(page)
 
 
 def browser_fetch(url: str, timeout: int = 45000) -> tuple:
     """
     Use Playwright to navigate to *url*, attempt to bypass 21+ age gates,
-    capture JSON network responses from API/menu/Dutchie endpoints,
-    and return the rendered HTML.
+    capture JSON and GraphQL network responses, and return the rendered
+    HTML.
+
+    Runs on the shared Chromium via ``run_with_browser``; each call only
+    opens (and closes) its own browser context.
 
     Args:
         url: The target URL to navigate to.
@@ -172,61 +408,41 @@ def browser_fetch(url: str, timeout: int = 45000) -> tuple:
             "text_snippet": <first 200 chars of body text or None>,
             "data": <alias for json field – kept for backward compat>,
           }
-          Responses are filtered to API/menu/JSON endpoints.
+          Responses are filtered to JSON and GraphQL endpoints and capped at
+          ``_MAX_CAPTURED_ENTRIES`` entries / ``_MAX_CAPTURED_TOTAL_BYTES``
+          of raw body per fetch.
         - final_url (str): URL after any redirects/navigation.
     """
     if not HAS_PLAYWRIGHT:
         return "", [], url
 
     captured: list[dict] = []
+    captured_bytes = 0
     html = ""
     final_url = url
 
-    def _should_capture(req_url: str, ctype: str) -> bool:
-        """Return True if this response looks like an API/menu JSON response."""
-        url_lower = req_url.lower()
-        if any(pat in url_lower for pat in _CAPTURE_URL_PATTERNS):
-            return True
-        if "json" in ctype or "graphql" in ctype:
-            return True
-        return False
-
     def _on_response(response) -> None:
-        """Capture JSON payloads from API/menu endpoints."""
+        """Capture JSON and GraphQL payloads."""
+        nonlocal captured_bytes
+        if len(captured) >= _MAX_CAPTURED_ENTRIES:
+            return
         req_url = response.url
         url_lower = req_url.lower()
         ctype = (response.headers.get("content-type") or "").lower()
-        if not _should_capture(req_url, ctype):
-            return
-
-        # For GraphQL endpoints always try text() → json.loads() so we are
-        # not gated on Content-Type being exactly 'application/json'.
+        # Capture policy, checked once: every JSON response, plus GraphQL
+        # endpoints whatever their Content-Type (not all send
+        # 'application/json')
         is_graphql = "graphql" in url_lower or "operationname" in url_lower
-        if is_graphql:
-            try:
-                text = response.text()
-                body = json.loads(text)
-                if not body:
-                    return
-                entry = {
-                    "url": req_url,
-                    "status": response.status,
-                    "content_type": ctype,
-                    "json": body,
-                    "data": body,
-                    "text_snippet": text[:200],
-                }
-                captured.append(entry)
-            except Exception:
-                pass
-            return
-
-        # Non-GraphQL endpoints: require a JSON content-type
-        if "json" not in ctype:
+        if not is_graphql and "json" not in ctype:
             return
         try:
-            body = response.json()
-            # Skip empty bodies — there's nothing useful to parse
+            raw = response.body()
+            # Skip empty and oversized bodies — nothing useful to parse
+            if not raw or len(raw) > _MAX_CAPTURE_BYTES:
+                return
+            if captured_bytes + len(raw) > _MAX_CAPTURED_TOTAL_BYTES:
+                return
+            body = _json_loads(raw)
             if not body:
                 return
             entry = {
@@ -235,24 +451,27 @@ def browser_fetch(url: str, timeout: int = 45000) -> tuple:
                 "content_type": ctype,
                 "json": body,
                 "data": body,  # backward-compat alias
-                "text_snippet": None,
+                "text_snippet": (
+                    raw[:200].decode("utf-8", "replace") if is_graphql else None
+                ),
             }
             captured.append(entry)
+            captured_bytes += len(raw)
         except Exception:
             pass
 
-    def _launch_and_fetch() -> None:
-        nonlocal html, final_url
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                viewport={"width": 1400, "height": 900},
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/123.0.0.0 Safari/537.36"
-                ),
-            )
+    def _fetch_with_browser(browser) -> tuple:
+        # Fresh context per call keeps cookies/storage isolated on the
+        # shared browser
+        context = browser.new_context(
+            viewport={"width": 1400, "height": 900},
+            user_agent=(
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/123.0.0.0 Safari/537.36"
+            ),
+        )
+        try:
             # Pre-set localStorage keys commonly checked by age gates
             context.add_init_script(
                 """
@@ -265,35 +484,40 @@ def browser_fetch(url: str, timeout: int = 45000) -> tuple:
                 } catch(e) {}
                 """
             )
+            context.add_cookies(_age_gate_cookies(url))
+            context.route("**/*", _block_heavy_resources)
+            context.set_default_timeout(_DEFAULT_ACTION_TIMEOUT_MS)
+            context.set_default_navigation_timeout(timeout)
             page = context.new_page()
             page.on("response", _on_response)
 
-            # Navigate and wait for the initial DOM to be ready
+            # Navigate, then let the initial XHR burst finish (fast pages
+            # go idle well before the cap)
             page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-            page.wait_for_timeout(2000)
-
-            # Attempt to dismiss the age gate
-            try_bypass_age_gate(page)
-            page.wait_for_timeout(2000)
+            _wait_for_network_idle(page, _SETTLE_TIMEOUT_MS)
 
-            # Scroll to trigger lazy-loaded menu items
-            for _ in range(3):
-                page.mouse.wheel(0, 3000)
+            # Attempt to dismiss the age gate; only a click needs extra
+            # time for the menu behind it to load
+            if try_bypass_age_gate(page):
                 page.wait_for_timeout(1000)
 
-            final_url = page.url
-            html = page.content()
-            browser.close()
+            # Scroll to trigger lazy-loaded menu items, in-page, until the
+            # document stops growing
+            page.evaluate(_SCROLL_TO_END_JS, [_SCROLL_MAX_STEPS, _SCROLL_PAUSE_MS])
+
+            return page.content(), page.url
+        finally:
+            context.close()
 
     try:
-        _launch_and_fetch()
+        html, final_url = run_with_browser(_fetch_with_browser)
     except Exception as exc:
         if is_missing_browser_error(exc):
             # Attempt one-time auto-install then retry
             installed = auto_install_playwright_chromium()
             if installed:
                 try:
-                    _launch_and_fetch()
+                    html, final_url = run_with_browser(_fetch_with_browser)
                 except Exception:
                     html = ""
             else:
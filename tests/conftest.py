@@ -0,0 +1,5 @@
+"""Put the repository root on sys.path so tests can import app and scraping."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+"""Tests for _parse_batch_entries, the batch scan box / CSV upload parser."""
+import unittest
+
+import app
+
+
+class TestParseBatchEntries(unittest.TestCase):
+    def test_urls_and_labelled_urls(self):
+        text = "https://a.com/menu\nSolar Somerset, https://dutchie.com/dispensary/solar\n"
+        self.assertEqual(
+            app._parse_batch_entries(text),
+            [
+                ("https://a.com/menu", "https://a.com/menu"),
+                ("https://dutchie.com/dispensary/solar", "Solar Somerset"),
+            ],
+        )
+
+    def test_blank_lines_and_empty_input(self):
+        self.assertEqual(app._parse_batch_entries(""), [])
+        self.assertEqual(app._parse_batch_entries(None), [])
+        self.assertEqual(
+            app._parse_batch_entries("\n\n   \nhttps://a.com\n\n"),
+            [("https://a.com", "https://a.com")],
+        )
+
+    def test_csv_header_row_is_skipped(self):
+        text = "label,url\nNEA,https://b.com/menu\n"
+        self.assertEqual(
+            app._parse_batch_entries(text), [("https://b.com/menu", "NEA")]
+        )
+
+    def test_url_column_first(self):
+        text = "url,label\nhttps://b.com/menu,NEA Fall River\n"
+        self.assertEqual(
+            app._parse_batch_entries(text), [("https://b.com/menu", "NEA Fall River")]
+        )
+
+    def test_duplicate_urls_keep_first_label(self):
+        text = "First, https://a.com\nSecond, https://a.com\nhttps://a.com\n"
+        self.assertEqual(app._parse_batch_entries(text), [("https://a.com", "First")])
+
+    def test_malformed_rows_are_skipped(self):
+        text = (
+            "just some notes\n"
+            ",,,\n"
+            "Label, example.com/no-scheme\n"
+            "ftp://c.com/menu\n"
+            '"Unclosed, https://d.com\n'
+            "Quoted \"x\", https://e.com\n"
+            "HTTPS://F.COM/Menu\n"
+        )
+        self.assertEqual(
+            app._parse_batch_entries(text),
+            [
+                ("https://e.com", 'Quoted "x"'),
+                ("HTTPS://F.COM/Menu", "HTTPS://F.COM/Menu"),
+            ],
+        )
+
+    def test_windows_line_endings(self):
+        text = "A, https://a.com\r\nB, https://b.com\r\n"
+        self.assertEqual(
+            app._parse_batch_entries(text),
+            [("https://a.com", "A"), ("https://b.com", "B")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Tests for product extraction from captured JSON: the single-pass field
+lookup and subtree skipping in scraping.dutchie_parser, and the product
+list search in scraping.dutchie_graphql.
+"""
+import math
+import re
+import unittest
+
+from scraping import dutchie_graphql as g
+from scraping import dutchie_parser as p
+
+
+# ---------------------------------------------------------------------------
+# The per-field lookups _extract_fields replaced: one full scan of the keys
+# per field, first usable key wins.  Kept here as the reference behaviour.
+# ---------------------------------------------------------------------------
+
+
+def _old_name(obj):
+    for k, v in obj.items():
+        if k.lower() in p._NAME_KEYS and isinstance(v, str) and len(v.strip()) > 1:
+            return v.strip()
+    return None
+
+
+def _old_price(obj):
+    for k, v in obj.items():
+        if k.lower() not in p._PRICE_KEYS:
+            continue
+        if isinstance(v, (int, float)) and v > 0:
+            return float(v)
+        if isinstance(v, str):
+            m = re.search(r"\d+\.?\d*", v.replace(",", ""))
+            if m:
+                return float(m.group(0))
+    return None
+
+
+def _old_thc(obj):
+    for k, v in obj.items():
+        if k.lower() not in p._THC_KEYS:
+            continue
+        if isinstance(v, (int, float)):
+            return float(v)
+        if isinstance(v, str):
+            m = re.search(r"(\d+\.?\d*)", v)
+            if m:
+                return float(m.group(1))
+    return None
+
+
+def _old_category(obj):
+    for k, v in obj.items():
+        if k.lower() not in p._CATEGORY_KEYS:
+            continue
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+        if isinstance(v, dict):
+            inner = v.get("name") or v.get("title")
+            if inner and isinstance(inner, str):
+                return inner.strip()
+    return None
+
+
+_FIELD_CASES = [
+    {"name": "Blue Dream", "price": 35, "thc": 22.5, "category": "Flower"},
+    # Unusable earlier keys fall through to later ones
+    {"name": " ", "Title": "  Gelato  ", "price": 0, "salePrice": "$1,020.00"},
+    {"Price": "call", "listPrice": "12.50", "THC": "n/a", "thcMax": "24%"},
+    {"type": "", "category": {"name": " Edibles "}, "kind": "ignored"},
+    {"category": {"id": 3}, "Type": "Vape", "productType": "Cart"},
+    # First usable key wins even when a later one also qualifies
+    {"displayName": "First", "name": "Second", "amount": 5, "price": 9},
+    {"thcMin": 0, "thcmax": 30, "subcategory": "Indica", "menuType": "rec"},
+    {"name": "X", "price": -4, "cost": True, "thcContent": "THC 18.2 %"},
+    {"productName": "Pre-Roll", "price": {"amount": 7}, "basePrice": None},
+    {"name": "Z", "title": "Y", "price": "no digits", "thc": {"v": 1}},
+    {},
+]
+
+
+class TestExtractFields(unittest.TestCase):
+    def test_matches_old_per_field_lookups(self):
+        for obj in _FIELD_CASES:
+            with self.subTest(obj=obj):
+                self.assertEqual(
+                    p._extract_fields(obj),
+                    (_old_name(obj), _old_category(obj), _old_price(obj), _old_thc(obj)),
+                )
+
+    def test_keys_are_case_insensitive(self):
+        name, category, price, thc = p._extract_fields(
+            {"NAME": "Kush", "CATEGORY": "Flower", "PRICE": 10, "THCPERCENTAGE": 20}
+        )
+        self.assertEqual((name, category, price, thc), ("Kush", "Flower", 10.0, 20.0))
+
+
+class TestSearchForProducts(unittest.TestCase):
+    def test_product_beside_media_and_seo_blobs(self):
+        data = {
+            "data": {
+                "seo": {"title": "Best Dispensary in Town"},
+                "images": [{"name": "banner.png"}, {"title": "Hero image"}],
+                "products": [
+                    {
+                        "name": "Blue Dream",
+                        "price": 35,
+                        "image": {"title": "Blue Dream photo", "url": "x.png"},
+                        "description": {"name": "<p>Rich HTML</p>"},
+                    },
+                    {"name": "Gelato", "price": 40, "seo": {"title": "Gelato | Shop"}},
+                ],
+            }
+        }
+        names = [r["Product"] for r in p._search_for_products(data)]
+        self.assertEqual(names, ["Blue Dream", "Gelato"])
+
+    def test_products_nested_in_non_skipped_containers(self):
+        data = {"menu": {"sections": [{"items": [{"title": "OG Kush", "price": "20"}]}]}}
+        rows = p._search_for_products(data)
+        self.assertEqual([(r["Product"], r["Price"]) for r in rows], [("OG Kush", 20.0)])
+
+    def test_parse_dutchie_responses_frame(self):
+        payloads = [
+            {"url": "https://dutchie.com/graphql", "json": {"products": [
+                {"name": "Alpha", "price": 10, "image": {"name": "Alpha.jpg"}},
+                {"name": "Alpha", "price": 10},
+                {"name": "Alpha", "price": 20},
+            ]}},
+            {"url": "legacy", "data": [{"name": "Bravo"}]},
+            {"url": "empty", "json": None},
+        ]
+        df = p.parse_dutchie_responses(payloads)
+        self.assertEqual(list(df["Product"]), ["Alpha", "Alpha", "Bravo"])
+        self.assertEqual(list(df["Price"])[:2], [10.0, 20.0])
+        self.assertTrue(math.isnan(df["Price"].iloc[2]))
+        self.assertEqual(df["Source"].iloc[2], "API (legacy)")
+        self.assertEqual(str(df["Price"].dtype), "float64")
+
+    def test_no_products_gives_empty_frame_with_columns(self):
+        df = p.parse_dutchie_responses([{"url": "x", "json": {"seo": {"title": "T"}}}])
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), p._COLUMNS)
+
+
+def _named(n, prefix="p"):
+    return [{"name": f"{prefix}{i}"} for i in range(n)]
+
+
+class TestFindProductList(unittest.TestCase):
+    def test_largest_named_list_wins(self):
+        body = {"data": {"a": {"items": _named(3, "a")}, "b": {"items": _named(7, "b")}}}
+        self.assertEqual(g._find_product_list(body), _named(7, "b"))
+
+    def test_metadata_keys_are_skipped(self):
+        body = {
+            "data": {
+                "facets": _named(40, "facet"),
+                "filters": {"options": _named(30, "filter")},
+                "pageInfo": {"pages": _named(20, "page")},
+                "results": {"edges": _named(5)},
+            }
+        }
+        self.assertEqual(g._find_product_list(body), _named(5))
+
+    def test_stops_at_a_full_page_under_a_product_key(self):
+        full = _named(g._PRODUCT_LIST_TARGET, "first")
+        body = {"first": {"products": full}, "second": {"products": _named(80, "second")}}
+        self.assertIs(g._find_product_list(body), full)
+
+    def test_long_list_under_other_key_does_not_stop_search(self):
+        body = {
+            "related": {"items": _named(60, "related")},
+            "menu": {"products": _named(90, "menu")},
+        }
+        self.assertEqual(g._find_product_list(body), _named(90, "menu"))
+
+    def test_extract_products_prefers_known_paths(self):
+        payload = {"json": {"data": {
+            "filteredProducts": {"products": _named(2)},
+            "other": {"list": _named(9, "x")},
+        }}}
+        self.assertEqual(g._extract_products_from_payload(payload), _named(2))
+
+    def test_extract_products_falls_back_to_search(self):
+        payload = {"json": {"data": {"menu": {"facets": _named(9, "f"), "list": _named(4)}}}}
+        self.assertEqual(g._extract_products_from_payload(payload), _named(4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,278 @@
+"""
+Tests for the Dutchie GraphQL replay: capturing the browser's request,
+rewriting its variables per category/page, and re-sending it over HTTP.
+
+The captured request and product data come from
+fixtures/dutchie_filtered_products.json; the HTTP side is a fake session
+that pages through those products the way Dutchie's API does.
+"""
+import json
+import os
+import unittest
+from urllib.parse import parse_qsl, urlsplit
+
+from scraping import dutchie_graphql as g
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+with open(os.path.join(FIXTURES, "dutchie_filtered_products.json"), encoding="utf-8") as f:
+    FIXTURE = json.load(f)
+
+
+class _FakeRequest:
+    """The bits of a Playwright Request that _capture_replay_template reads."""
+
+    def __init__(self, method, url, headers, post_data=None):
+        self.method = method
+        self.url = url
+        self.post_data = post_data
+        self._headers = headers
+
+    def all_headers(self):
+        return dict(self._headers)
+
+
+class _FakeResponse:
+    def __init__(self, url, status, body: bytes):
+        self.url = url
+        self.status_code = status
+        self.content = body
+        self.headers = {"content-type": "application/json"}
+
+
+class _FakeSession:
+    """Serves fixture products by productsFilter.types, perPage at a time."""
+
+    def __init__(self, status=200, body=None):
+        self.calls = []
+        self._status = status
+        self._body = body
+
+    def _respond(self, url, variables, headers):
+        self.calls.append({"url": url, "variables": variables, "headers": headers})
+        if self._body is not None:
+            return _FakeResponse(url, self._status, self._body)
+        products = []
+        for t in variables["productsFilter"].get("types") or []:
+            products.extend(FIXTURE["products"].get(t, []))
+        start = variables["page"] * variables["perPage"]
+        page = products[start : start + variables["perPage"]]
+        body = {"data": {"filteredProducts": {"products": page}}}
+        return _FakeResponse(url, self._status, json.dumps(body).encode())
+
+    def get(self, url, headers=None, timeout=None):
+        query = dict(parse_qsl(urlsplit(url).query))
+        return self._respond(url, json.loads(query["variables"]), headers)
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        return self._respond(url, json.loads(data)["variables"], headers)
+
+
+def _fixture_template():
+    req = FIXTURE["request"]
+    return g._capture_replay_template(
+        _FakeRequest(req["method"], req["url"], req["headers"], req["post_data"])
+    )
+
+
+def _names(payload):
+    return [p["name"] for p in g._extract_products_from_payload(payload)]
+
+
+class TestCaptureReplayTemplate(unittest.TestCase):
+    def test_get_request_from_fixture(self):
+        tmpl = _fixture_template()
+        self.assertEqual(tmpl["method"], "GET")
+        self.assertIsNone(tmpl["body"])
+        self.assertEqual(tmpl["variables"]["page"], 0)
+        self.assertEqual(tmpl["variables"]["productsFilter"]["types"], ["Flower"])
+        # Pseudo-headers and transport headers are not replayed
+        self.assertNotIn(":authority", tmpl["headers"])
+        self.assertNotIn("host", tmpl["headers"])
+        self.assertNotIn("accept-encoding", tmpl["headers"])
+        self.assertEqual(tmpl["headers"]["x-dutchie-session"], "abc")
+
+    def test_post_request(self):
+        body = {
+            "operationName": "FilteredProducts",
+            "variables": {"productsFilter": {"types": []}, "page": 1, "perPage": 50},
+            "query": "query FilteredProducts { ... }",
+        }
+        tmpl = g._capture_replay_template(
+            _FakeRequest("post", "https://dutchie.com/graphql", {}, json.dumps(body))
+        )
+        self.assertEqual(tmpl["method"], "POST")
+        self.assertEqual(tmpl["body"]["operationName"], "FilteredProducts")
+        self.assertEqual(tmpl["variables"]["page"], 1)
+
+    def test_requests_without_page_variable_are_not_replayable(self):
+        for post_data in (None, "not json", json.dumps({"variables": {"id": "x"}})):
+            self.assertIsNone(
+                g._capture_replay_template(
+                    _FakeRequest("POST", "https://dutchie.com/graphql", {}, post_data)
+                )
+            )
+
+
+class TestReplayVariables(unittest.TestCase):
+    def setUp(self):
+        self.tmpl = _fixture_template()
+
+    def test_page_is_offset_from_the_captured_page(self):
+        # The fixture query is 0-based; crawl pages are 1-based
+        self.assertEqual(g._replay_variables(self.tmpl, None, 1)["page"], 0)
+        self.assertEqual(g._replay_variables(self.tmpl, None, 3)["page"], 2)
+
+    def test_one_based_template(self):
+        self.tmpl["variables"]["page"] = 1
+        self.assertEqual(g._replay_variables(self.tmpl, None, 2)["page"], 2)
+
+    def test_category_slug_maps_to_dutchie_type(self):
+        """Dutchie filters on display names, some of them singular."""
+        for slug, expected in (
+            ("pre-rolls", "Pre-Rolls"),
+            ("flower", "Flower"),
+            ("edibles", "Edible"),
+            ("concentrates", "Concentrate"),
+            ("tinctures", "Tincture"),
+        ):
+            with self.subTest(slug=slug):
+                v = g._replay_variables(self.tmpl, slug, 1)
+                self.assertEqual(v["productsFilter"]["types"], [expected])
+
+    def test_unknown_slug_is_title_cased(self):
+        v = g._replay_variables(self.tmpl, "gift-cards", 1)
+        self.assertEqual(v["productsFilter"]["types"], ["Gift-Cards"])
+
+    def test_no_category_keeps_captured_filter(self):
+        v = g._replay_variables(self.tmpl, None, 2)
+        self.assertEqual(v["productsFilter"]["types"], ["Flower"])
+
+    def test_other_variables_are_preserved(self):
+        v = g._replay_variables(self.tmpl, "edibles", 2)
+        self.assertEqual(v["perPage"], 2)
+        self.assertEqual(v["productsFilter"]["dispensaryId"], "5f3c0a1b2c")
+        self.assertEqual(v["productsFilter"]["pricingType"], "rec")
+
+    def test_template_is_not_mutated(self):
+        before = json.dumps(self.tmpl["variables"], sort_keys=True)
+        g._replay_variables(self.tmpl, "vaporizers", 4)
+        self.assertEqual(json.dumps(self.tmpl["variables"], sort_keys=True), before)
+
+    def test_category_without_products_filter_is_not_replayable(self):
+        del self.tmpl["variables"]["productsFilter"]
+        self.assertIsNone(g._replay_variables(self.tmpl, "flower", 1))
+        self.assertIsNotNone(g._replay_variables(self.tmpl, None, 1))
+
+
+class TestReplayGraphql(unittest.TestCase):
+    def setUp(self):
+        self.tmpl = _fixture_template()
+
+    def test_pages_through_a_category(self):
+        session = _FakeSession()
+        pages = [
+            _names(g._replay_graphql(session, self.tmpl, "flower", pg, 5))
+            for pg in (1, 2, 3)
+        ]
+        self.assertEqual(pages, [["Blue Dream", "Gelato"], ["OG Kush"], []])
+        self.assertEqual([c["variables"]["page"] for c in session.calls], [0, 1, 2])
+        # Captured headers go out with every replay
+        self.assertTrue(all(c["headers"]["x-dutchie-session"] == "abc" for c in session.calls))
+
+    def test_other_category_uses_its_own_filter(self):
+        session = _FakeSession()
+        payload = g._replay_graphql(session, self.tmpl, "pre-rolls", 1, 5)
+        self.assertEqual(_names(payload), ["Sour Diesel Pre-Roll"])
+        self.assertEqual(payload["status"], 200)
+        self.assertIs(payload["json"], payload["data"])
+
+    def test_singular_type_category_is_found(self):
+        session = _FakeSession()
+        payload = g._replay_graphql(session, self.tmpl, "edibles", 1, 5)
+        self.assertEqual(_names(payload), ["Watermelon Gummies"])
+        self.assertEqual(session.calls[0]["variables"]["productsFilter"]["types"], ["Edible"])
+
+    def test_get_replay_keeps_other_query_params(self):
+        session = _FakeSession()
+        g._replay_graphql(session, self.tmpl, "flower", 2, 5)
+        query = dict(parse_qsl(urlsplit(session.calls[0]["url"]).query))
+        self.assertEqual(query["operationName"], "FilteredProducts")
+        self.assertIn("persistedQuery", query["extensions"])
+
+    def test_post_replay_sends_rewritten_body(self):
+        body = {
+            "operationName": "FilteredProducts",
+            "variables": dict(self.tmpl["variables"]),
+        }
+        tmpl = dict(self.tmpl, method="POST", url="https://dutchie.com/graphql", body=body)
+        session = _FakeSession()
+        payload = g._replay_graphql(session, tmpl, "flower", 2, 5)
+        self.assertEqual(_names(payload), ["OG Kush"])
+        self.assertEqual(session.calls[0]["variables"]["page"], 1)
+
+    def test_http_error_and_non_json_return_none(self):
+        self.assertIsNone(
+            g._replay_graphql(_FakeSession(status=403, body=b"{}"), self.tmpl, None, 1, 5)
+        )
+        self.assertIsNone(
+            g._replay_graphql(_FakeSession(body=b"<html>blocked</html>"), self.tmpl, None, 1, 5)
+        )
+        self.assertIsNone(
+            g._replay_graphql(_FakeSession(body=b"[1, 2]"), self.tmpl, None, 1, 5)
+        )
+
+    def test_unreplayable_category_sends_nothing(self):
+        del self.tmpl["variables"]["productsFilter"]
+        session = _FakeSession()
+        self.assertIsNone(g._replay_graphql(session, self.tmpl, "flower", 1, 5))
+        self.assertEqual(session.calls, [])
+
+
+class _FakeBrowserResponse:
+    """A Playwright Response as seen by the soft-navigation predicate."""
+
+    def __init__(self, request):
+        self.url = request.url
+        self.request = request
+
+
+def _product_query(category_type, page, **filters):
+    variables = {
+        "productsFilter": dict({"types": [category_type]}, **filters),
+        "page": page,
+        "perPage": 50,
+    }
+    body = {
+        "operationName": "FilteredProducts",
+        "variables": variables,
+        "query": "query FilteredProducts { filteredProducts { products { name } } }",
+    }
+    return _FakeBrowserResponse(
+        _FakeRequest("POST", "https://dutchie.com/graphql", {}, json.dumps(body))
+    )
+
+
+class TestIsPageQuery(unittest.TestCase):
+    def test_matches_target_category_and_page(self):
+        self.assertTrue(g._is_page_query(_product_query("Edible", 1), "edibles", 1))
+        self.assertTrue(g._is_page_query(_product_query("Pre-Rolls", 0), "pre-rolls", 0))
+
+    def test_stale_page_or_category_is_rejected(self):
+        self.assertFalse(g._is_page_query(_product_query("Edible", 0), "edibles", 1))
+        self.assertFalse(g._is_page_query(_product_query("Flower", 1), "edibles", 1))
+
+    def test_specials_query_is_rejected(self):
+        resp = _product_query("Edible", 1, isOnSpecial=True)
+        self.assertFalse(g._is_page_query(resp, "edibles", 1))
+
+    def test_unknown_page_index_matches_any_page(self):
+        self.assertTrue(g._is_page_query(_product_query("Flower", 3), "flower", None))
+
+    def test_non_product_queries_are_rejected(self):
+        req = _FakeRequest("POST", "https://dutchie.com/graphql", {}, '{"operationName": "Specials"}')
+        self.assertFalse(g._is_page_query(_FakeBrowserResponse(req), "flower", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Tests for parse_products_from_embedded_state (__NEXT_DATA__ / __APOLLO_STATE__)."""
+import os
+import unittest
+
+import app
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _parse_fixture(name: str):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return app.parse_products_from_embedded_state(app._parse_html(f.read()))
+
+
+@unittest.skipUnless(app.HAS_BROWSER_HELPERS, "scraping helpers not importable")
+class TestEmbeddedState(unittest.TestCase):
+    def test_next_data_script(self):
+        df = _parse_fixture("next_data.html")
+        self.assertEqual(list(df["Product"]), ["Blue Dream 3.5g", "Gelato Gummies"])
+        self.assertEqual(list(df["Category"]), ["Flower", "Edibles"])
+        self.assertEqual(list(df["Price"]), [35.0, 18.0])
+        self.assertEqual(list(df["THC"]), [22.5, 10.0])
+        self.assertTrue((df["Source"] == "API (__NEXT_DATA__)").all())
+
+    def test_apollo_state_assignment(self):
+        """raw_decode must stop at the object literal, ignoring trailing JS."""
+        df = _parse_fixture("apollo_state.html")
+        self.assertEqual(list(df["Product"]), ["OG Kush 1g", "Sour Diesel Cart"])
+        self.assertEqual(list(df["Price"]), [12.5, 45.0])
+        self.assertNotIn("Not a product", list(df["Product"]))
+        self.assertTrue((df["Source"] == "API (__APOLLO_STATE__)").all())
+
+    def test_truncated_blobs_give_empty_frame(self):
+        df = _parse_fixture("embedded_state_invalid.html")
+        self.assertTrue(df.empty)
+
+    def test_page_without_state(self):
+        df = app.parse_products_from_embedded_state(
+            app._parse_html("<html><body><p>$10</p></body></html>")
+        )
+        self.assertTrue(df.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
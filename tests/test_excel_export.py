@@ -0,0 +1,64 @@
+"""
+Tests for make_excel_bytes, the streaming xlsxwriter export.
+
+Importing app runs its Streamlit UI code in bare mode (no server), which
+only logs "missing ScriptRunContext" warnings.
+"""
+import unittest
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import app
+
+
+def _sheet_text(buf) -> str:
+    """The worksheet XML plus shared strings of an exported workbook."""
+    with zipfile.ZipFile(buf) as zf:
+        parts = [zf.read("xl/worksheets/sheet1.xml")]
+        if "xl/sharedStrings.xml" in zf.namelist():
+            parts.append(zf.read("xl/sharedStrings.xml"))
+    return b"".join(parts).decode("utf-8")
+
+
+class TestMakeExcelBytes(unittest.TestCase):
+    def test_scalar_rows_are_written(self):
+        df = pd.DataFrame(
+            {
+                "Product": ["Blue Dream", "Gelato"],
+                "Price": [35.0, np.nan],
+                "THC": [np.float64(22.5), None],
+                "Qty": np.array([1, 2], dtype="int64"),
+            }
+        )
+        text = _sheet_text(app.make_excel_bytes(df))
+        self.assertIn("Blue Dream", text)
+        self.assertIn("Gelato", text)
+        self.assertIn("<v>35</v>", text)
+        self.assertIn("<v>22.5</v>", text)
+
+    def test_non_scalar_cells_are_stringified(self):
+        """Lists and dicts (e.g. an odd JSON-LD name) must not break the export."""
+        df = pd.DataFrame(
+            {
+                "Product": [["Blue", "Dream"], {"@value": "Gelato"}, "OG Kush"],
+                "Price": [10.0, 20.0, 30.0],
+            }
+        )
+        text = _sheet_text(app.make_excel_bytes(df)).replace("&apos;", "'")
+        self.assertIn("['Blue', 'Dream']", text)
+        self.assertIn("{'@value': 'Gelato'}", text)
+        self.assertIn("OG Kush", text)
+
+    def test_categorical_columns_with_missing_values(self):
+        df = pd.DataFrame(
+            {"Dispensary": pd.Categorical(["A", None]), "Price": [1.0, 2.0]}
+        )
+        text = _sheet_text(app.make_excel_bytes(df))
+        self.assertIn("Dispensary", text)
+        self.assertIn(">A<", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Tests for _fetch_html_cached, the streamed static page fetch behind
+fetch_html, using real requests.Response objects over in-memory bodies.
+"""
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.response import HTTPResponse
+
+import app
+
+
+class _CountingBody(io.BytesIO):
+    """Body stream that records how many bytes were read from it."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, *args):
+        chunk = super().read(*args)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _response(url, body: bytes, content_type="text/html", status=200):
+    headers = CaseInsensitiveDict({"Content-Type": content_type} if content_type else {})
+    stream = _CountingBody(body)
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = "OK" if status < 400 else "Error"
+    resp.url = url
+    resp.headers = headers
+    resp.raw = HTTPResponse(body=stream, headers=dict(headers), preload_content=False)
+    resp.encoding = get_encoding_from_headers(headers)
+    resp.stream = stream
+    return resp
+
+
+class _FakeSession:
+    def __init__(self, make_response):
+        self._make_response = make_response
+        self.calls = []
+
+    def get(self, url, timeout=None, stream=False):
+        self.calls.append(url)
+        return self._make_response(url)
+
+
+class _FetchTestCase(unittest.TestCase):
+    def setUp(self):
+        app._fetch_html_cached.clear()
+
+    def _fetch(self, body, content_type="text/html", status=200, url="https://a.test/menu"):
+        responses = []
+
+        def make(u):
+            responses.append(_response(u, body, content_type, status))
+            return responses[-1]
+
+        with mock.patch.object(app, "_SESSION", _FakeSession(make)):
+            try:
+                return app._fetch_html_cached(url, 5), responses[0]
+            except Exception as exc:
+                return exc, responses[0]
+
+
+class TestResponseChecks(_FetchTestCase):
+    def test_html_page_is_returned(self):
+        html, _ = self._fetch(b"<html><body>Menu</body></html>")
+        self.assertEqual(html, "<html><body>Menu</body></html>")
+
+    def test_non_html_content_type_is_rejected_before_download(self):
+        for ctype in ("application/pdf", "image/png", "application/json"):
+            with self.subTest(ctype=ctype):
+                app._fetch_html_cached.clear()
+                result, resp = self._fetch(b"%PDF-1.7" * 1000, content_type=ctype)
+                self.assertIsInstance(result, ValueError)
+                self.assertIn(ctype, str(result))
+                self.assertEqual(resp.stream.bytes_read, 0)
+
+    def test_text_and_xml_types_are_accepted(self):
+        for ctype in ("text/plain", "application/xhtml+xml", "text/html; charset=utf-8", ""):
+            with self.subTest(ctype=ctype):
+                app._fetch_html_cached.clear()
+                html, _ = self._fetch(b"<p>ok</p>", content_type=ctype)
+                self.assertEqual(html, "<p>ok</p>")
+
+    def test_http_error_raises_without_reading_body(self):
+        result, resp = self._fetch(b"<html>Not found</html>", status=404)
+        self.assertIsInstance(result, requests.HTTPError)
+        self.assertEqual(resp.stream.bytes_read, 0)
+
+    def test_errors_are_not_cached(self):
+        self._fetch(b"", status=503)
+        html, _ = self._fetch(b"<p>back</p>")
+        self.assertEqual(html, "<p>back</p>")
+
+
+class TestBodyCap(_FetchTestCase):
+    def test_body_is_capped_at_max_html_bytes(self):
+        body = b"<html>" + b"a" * (app.MAX_HTML_BYTES + 500_000)
+        html, resp = self._fetch(body)
+        self.assertEqual(len(html), app.MAX_HTML_BYTES)
+        self.assertLessEqual(resp.stream.bytes_read, app.MAX_HTML_BYTES)
+
+    def test_small_body_is_read_whole(self):
+        body = b"<html>" + b"b" * 1000 + b"</html>"
+        html, _ = self._fetch(body)
+        self.assertEqual(html.encode(), body)
+
+
+class TestPerHostConcurrency(_FetchTestCase):
+    def test_at_most_host_concurrency_fetches_per_host(self):
+        lock = threading.Lock()
+        active: dict[str, int] = {}
+        peak: dict[str, int] = {}
+
+        class _SlowSession:
+            def get(self, url, timeout=None, stream=False):
+                host = url.split("/")[2]
+                with lock:
+                    active[host] = active.get(host, 0) + 1
+                    peak[host] = max(peak.get(host, 0), active[host])
+                time.sleep(0.05)
+                with lock:
+                    active[host] -= 1
+                return _response(url, b"<p>ok</p>")
+
+        urls = [f"https://one.test/menu/{i}" for i in range(6)]
+        urls += [f"https://two.test/menu/{i}" for i in range(2)]
+        with mock.patch.object(app, "_SESSION", _SlowSession()):
+            threads = [
+                threading.Thread(target=app._fetch_html_cached, args=(u, 5)) for u in urls
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=10)
+
+        self.assertEqual(peak["one.test"], app._HOST_CONCURRENCY)
+        self.assertEqual(peak["two.test"], 2)
+
+    def test_one_semaphore_per_host(self):
+        a = app._host_slot("https://Shop.test/a")
+        self.assertIs(a, app._host_slot("https://shop.test/b?x=1"))
+        self.assertIsNot(a, app._host_slot("https://other.test/a"))
+
+
+class TestCharsetDecoding(_FetchTestCase):
+    def test_declared_non_utf8_charset(self):
+        body = "<p>Café – Sativa ½ oz</p>".encode("windows-1252")
+        html, _ = self._fetch(body, content_type="text/html; charset=windows-1252")
+        self.assertEqual(html, "<p>Café – Sativa ½ oz</p>")
+
+    def test_declared_latin1_charset(self):
+        body = "<p>Piña Colada</p>".encode("iso-8859-1")
+        html, _ = self._fetch(body, content_type="text/html; charset=ISO-8859-1")
+        self.assertEqual(html, "<p>Piña Colada</p>")
+
+    def test_missing_charset_decodes_utf8(self):
+        """requests would guess ISO-8859-1 for text/html and garble UTF-8."""
+        body = "<p>Café ☕ – “Dream”</p>".encode("utf-8")
+        html, _ = self._fetch(body, content_type="text/html")
+        self.assertEqual(html, "<p>Café ☕ – “Dream”</p>")
+
+    def test_missing_charset_with_invalid_utf8_is_replaced(self):
+        html, _ = self._fetch(b"<p>caf\xe9</p>", content_type="text/html")
+        self.assertEqual(html, "<p>caf\ufffd</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
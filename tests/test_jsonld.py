@@ -0,0 +1,99 @@
+"""Tests for parse_products_from_jsonld: nested JSON-LD shapes and odd values."""
+import json
+import math
+import unittest
+
+import app
+
+
+def _parse(*blocks, category_hint=None):
+    html = "".join(
+        f'<script type="application/ld+json">{json.dumps(b)}</script>' for b in blocks
+    )
+    return app.parse_products_from_jsonld(
+        app._parse_html(f"<html><head>{html}</head></html>"), category_hint
+    )
+
+
+class TestJsonLdNesting(unittest.TestCase):
+    def test_products_under_graph(self):
+        df = _parse(
+            {
+                "@context": "https://schema.org",
+                "@graph": [
+                    {"@type": "WebSite", "name": "Dispensary"},
+                    {"@type": "Product", "name": "Blue Dream", "offers": {"price": "35"}},
+                    {"@type": "Product", "name": "Gelato", "offers": {"price": 40}},
+                ],
+            }
+        )
+        self.assertEqual(list(df["Product"]), ["Blue Dream", "Gelato"])
+        self.assertEqual(list(df["Price"]), [35.0, 40.0])
+        self.assertTrue((df["Source"] == "JSON-LD").all())
+
+    def test_item_list_of_list_items(self):
+        df = _parse(
+            {
+                "@type": "ItemList",
+                "itemListElement": [
+                    {
+                        "@type": "ListItem",
+                        "position": 1,
+                        "item": {"@type": "Product", "name": "OG Kush"},
+                    },
+                    {
+                        "@type": "ListItem",
+                        "position": 2,
+                        "item": {"@type": "Product", "name": "Sour Diesel"},
+                    },
+                ],
+            },
+            category_hint="flower",
+        )
+        self.assertEqual(list(df["Product"]), ["OG Kush", "Sour Diesel"])
+        self.assertTrue((df["Category"] == "flower").all())
+        self.assertTrue(df["Price"].isna().all())
+
+    def test_list_valued_offers_uses_first_offer(self):
+        df = _parse(
+            {
+                "@type": "Product",
+                "name": "Gummies",
+                "offers": [{"price": "12.50"}, {"price": "20"}],
+                "additionalProperty": [{"name": "THC", "value": "10 mg"}],
+            }
+        )
+        self.assertEqual(df["Price"].iloc[0], 12.5)
+        self.assertEqual(df["THC"].iloc[0], 10.0)
+
+
+class TestJsonLdOddValues(unittest.TestCase):
+    def test_non_dict_offers_are_ignored(self):
+        df = _parse(
+            {"@type": "Product", "name": "A", "offers": "https://example.com/offer"},
+            {"@type": "Product", "name": "B", "offers": ["https://example.com/offer"]},
+        )
+        self.assertEqual(list(df["Product"]), ["A", "B"])
+        self.assertTrue(all(math.isnan(p) for p in df["Price"]))
+
+    def test_non_string_property_name_is_ignored(self):
+        df = _parse(
+            {
+                "@type": "Product",
+                "name": "C",
+                "additionalProperty": [
+                    {"name": {"@value": "THC"}, "value": 99},
+                    {"name": "thcPercentage", "value": 21.5},
+                ],
+            }
+        )
+        self.assertEqual(df["THC"].iloc[0], 21.5)
+
+    def test_no_scripts_gives_empty_frame(self):
+        df = app.parse_products_from_jsonld(app._parse_html("<html></html>"))
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), app._PRODUCT_COLUMNS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests for the single-pass price/THC scan (_PRICE_THC_RE) shared by the OCR
+and HTML card parsers.  Price and THC are alternatives of one regex, so
+the digits of a price can never also be read as the THC value.
+"""
+import math
+import unittest
+
+import app
+
+
+def _nan(v):
+    return isinstance(v, float) and math.isnan(v)
+
+
+class TestFirstPriceThc(unittest.TestCase):
+    def _values(self, text):
+        m_price, m_thc = app._first_price_thc(text)
+        return app._match_price(m_price), app._match_thc(m_thc)
+
+    def test_price_before_thc(self):
+        self.assertEqual(self._values("Blue Dream $35.00 22.5% THC"), (35.0, 22.5))
+
+    def test_thc_before_price(self):
+        self.assertEqual(self._values("Gelato 24%THC 3.5g $1,020.00"), (1020.0, 24.0))
+
+    def test_price_digits_are_not_read_as_thc(self):
+        price, thc = self._values("OG Kush $35 THC")
+        self.assertEqual(price, 35.0)
+        self.assertTrue(_nan(thc))
+
+    def test_first_of_each_wins(self):
+        self.assertEqual(self._values("$10 18% thc, $20 30% THC"), (10.0, 18.0))
+
+    def test_thc_without_percent_sign(self):
+        self.assertEqual(self._values("Gummies 10 THC $18"), (18.0, 10.0))
+
+    def test_neither_present(self):
+        price, thc = self._values("Featured brands")
+        self.assertTrue(_nan(price) and _nan(thc))
+
+    def test_unparseable_price_is_nan(self):
+        price, _ = self._values("Mystery $.. 20% THC")
+        self.assertTrue(_nan(price))
+
+
+class TestOcrText(unittest.TestCase):
+    def test_lines_with_price_and_thc(self):
+        text = "\n".join(
+            [
+                "MENU",
+                "Blue Dream - $35.00 | 22.5% THC",
+                "24% THC Gelato $40",
+                "OG Kush $45 THC",
+                "$50",
+                "Sale ends Sunday",
+                "   ",
+            ]
+        )
+        df = app.parse_products_from_ocr_text(text)
+        # Names are the line with the price cut out (spacing kept as-is)
+        self.assertEqual(
+            list(df["Product"]),
+            ["Blue Dream -  | 22.5% THC", "24% THC Gelato", "OG Kush  THC"],
+        )
+        self.assertEqual(list(df["Price"]), [35.0, 40.0, 45.0])
+        self.assertEqual(list(df["THC"])[:2], [22.5, 24.0])
+        self.assertTrue(_nan(df["THC"].iloc[2]))
+        self.assertTrue((df["Source"] == "OCR screenshot").all())
+
+    def test_no_product_lines(self):
+        df = app.parse_products_from_ocr_text("Welcome\nOpen 9-9\n$$$")
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), app._PRODUCT_COLUMNS)
+
+
+class TestHtmlCards(unittest.TestCase):
+    def test_card_text_with_price_and_thc(self):
+        html = """
+        <div class="product-card"><h3>Blue Dream</h3>
+          <span>22.5% THC</span><span class="price">$35.00</span></div>
+        <div class="product-card" data-product-name="Gelato">
+          <span>$1,020.00</span><span>THC: 27 % THC</span></div>
+        <div class="product-card"><h3>OG Kush</h3><span>$45</span> THC</div>
+        <div class="product-card"><p>No name here $10</p></div>
+        """
+        df = app.extract_generic_cards(app._parse_html(html), category_hint="flower")
+        self.assertEqual(list(df["Product"]), ["Blue Dream", "Gelato", "OG Kush"])
+        self.assertEqual(list(df["Price"]), [35.0, 1020.0, 45.0])
+        self.assertEqual(list(df["THC"])[:2], [22.5, 27.0])
+        self.assertTrue(_nan(df["THC"].iloc[2]))
+        self.assertTrue((df["Category"] == "flower").all())
+
+
+if __name__ == "__main__":
+    unittest.main()